@@ -0,0 +1,243 @@
+"""
+Benchmark tox-asdf resolution and install paths.
+
+Everything runs against a hermetic fake `asdf` program (see `fake-asdf`)
+and a synthetic asdf data directory so real process spawn costs are measured
+without touching the host asdf installation.
+
+    python benchmarks/bench.py --installs 200 --available 700 --envs 12
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from tox_asdf import plugin
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CPYTHON_MINORS = ("2.7", "3.5", "3.6", "3.7", "3.8", "3.9", "3.10", "3.11", "3.12", "3.13")
+#: A fake interpreter answering the plugin metadata queries
+FAKE_PYTHON = """\
+#!/bin/sh
+echo '{"implementation": "CPython", "version_info": [3, 0, 0, "final", 0], \
+"extra_version_info": null, "is_64": true, "sysplatform": "linux", "os_sep": "/", "build": {}}'
+"""
+
+FLAVOURS = ("pypy2.7", "pypy3.8", "pypy3.9", "anaconda3", "miniconda3", "pyston")
+
+
+def synthetic_versions(count):
+    """Generate ``count`` plausible asdf python versions, families interleaved"""
+    families = ["{}.{{}}".format(minor) for minor in CPYTHON_MINORS]
+    families += ["{}-7.3.{{}}".format(flavour) for flavour in FLAVOURS]
+    versions = []
+    patch = 0
+    while len(versions) < count:
+        for family in families[: count - len(versions)]:
+            versions.append(family.format(patch))
+        patch += 1
+    return versions
+
+
+def synthetic_envs(count):
+    """Generate ``count`` environments basepython cycling over the known families"""
+    basepythons = ["python{}".format(minor) for minor in CPYTHON_MINORS] + ["pypy", "pypy3"]
+    return [SimpleNamespace(basepython=basepythons[i % len(basepythons)]) for i in range(count)]
+
+
+class Sandbox(object):
+    """A temporary asdf data directory served by the fake `asdf` program"""
+
+    def __init__(self, installs, available):
+        self.root = tempfile.mkdtemp(prefix="tox-asdf-bench-")
+        self.data_dir = os.path.join(self.root, "asdf")
+        self.installs = os.path.join(self.data_dir, "installs", "python")
+        self.cache_dir = os.path.join(self.root, "cache")
+        self.versions = synthetic_versions(installs)
+        self.available = synthetic_versions(max(available, installs))
+
+        bin_dir = os.path.join(self.root, "bin")
+        os.makedirs(bin_dir)
+        shutil.copy(os.path.join(HERE, "fake-asdf"), os.path.join(bin_dir, "asdf"))
+        available_file = os.path.join(self.root, "list-all")
+        with open(available_file, "w") as f:
+            f.write("\n".join(self.available))
+        for version in self.versions:
+            self.install(version)
+
+        self.environ = {
+            "PATH": os.pathsep.join((bin_dir, os.environ.get("PATH", ""))),
+            "ASDF_DATA_DIR": self.data_dir,
+            "XDG_CACHE_HOME": self.cache_dir,
+            "FAKE_ASDF_ALL": available_file,
+        }
+
+    def install(self, version):
+        bin_dir = os.path.join(self.installs, version, "bin")
+        os.makedirs(bin_dir)
+        python = os.path.join(bin_dir, "python")
+        with open(python, "w") as f:
+            f.write(FAKE_PYTHON)
+        os.chmod(python, 0o755)
+
+    def uninstall(self, version):
+        shutil.rmtree(os.path.join(self.installs, version), ignore_errors=True)
+
+    def clear_cache(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def __enter__(self):
+        self._backup = {key: os.environ.get(key) for key in self.environ}
+        os.environ.update(self.environ)
+        return self
+
+    def __exit__(self, *exc):
+        for key, value in self._backup.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def new_run(**options):
+    """Reset the plugin as if tox was starting a new run"""
+    plugin.CFG = plugin.Config()
+    for key, value in options.items():
+        setattr(plugin.CFG, key, value)
+    plugin.RUN = plugin.RunState()
+    plugin._CACHES.clear()
+
+
+def resolve_all(envs):
+    for envconfig in envs:
+        plugin.tox_get_python_executable(envconfig)
+
+
+class Bench(object):
+    def __init__(self, sandbox, repeat):
+        self.sandbox = sandbox
+        self.repeat = repeat
+        self.results = []
+
+    def measure(self, name, func, setup=None):
+        timings, spawns = [], []
+        for _ in range(self.repeat):
+            if setup:
+                setup()
+            spawned = len(plugin.RUN.timings.commands)
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+            # Every subprocess (asdf, interpreters...) is recorded by the plugin
+            spawns.append(len(plugin.RUN.timings.commands) - spawned)
+        self.results.append(
+            {
+                "name": name,
+                "median_ms": statistics.median(timings) * 1000,
+                "min_ms": min(timings) * 1000,
+                "max_ms": max(timings) * 1000,
+                "subprocesses": statistics.median(spawns),
+            }
+        )
+
+    def report(self, out=sys.stdout):
+        width = max(len(r["name"]) for r in self.results)
+        header = "{:<{w}}  {:>10}  {:>10}  {:>10}  {:>6}"
+        row = "{:<{w}}  {:>10.3f}  {:>10.3f}  {:>10.3f}  {:>6g}"
+        print(
+            header.format("benchmark", "median ms", "min ms", "max ms", "spawn", w=width), file=out
+        )
+        for r in self.results:
+            print(
+                row.format(
+                    r["name"], r["median_ms"], r["min_ms"], r["max_ms"], r["subprocesses"], w=width
+                ),
+                file=out,
+            )
+
+
+def run(args):
+    with Sandbox(args.installs, args.available) as sandbox:
+        bench = Bench(sandbox, args.repeat)
+        envs = synthetic_envs(args.envs)
+        specs = [plugin.expected_version(env.basepython) for env in envs]
+
+        bench.measure(
+            "best_version x{} (unindexed)".format(len(specs)),
+            lambda: [plugin.best_version(spec, sandbox.available) for spec in specs],
+        )
+        index = plugin.VersionIndex(sandbox.available)
+        bench.measure(
+            "best_version x{} (indexed)".format(len(specs)),
+            lambda: [plugin.best_version(spec, index) for spec in specs],
+        )
+
+        for resolver in ("cli", "batch", "fs"):
+            bench.measure(
+                "env cold ({})".format(resolver),
+                lambda: resolve_all(envs[:1]),
+                setup=lambda: new_run(resolver=resolver, cache=False),
+            )
+            bench.measure(
+                "matrix x{} cold ({})".format(len(envs), resolver),
+                lambda: resolve_all(envs),
+                setup=lambda: new_run(resolver=resolver, cache=False),
+            )
+
+        def warm():
+            sandbox.clear_cache()
+            new_run()
+            resolve_all(envs)
+            new_run()
+
+        bench.measure("env warm (disk cache)", lambda: resolve_all(envs[:1]), setup=warm)
+        bench.measure(
+            "matrix x{} warm (disk cache)".format(len(envs)), lambda: resolve_all(envs), setup=warm
+        )
+
+        target = plugin.best_version(specs[0], sandbox.versions)
+
+        def uninstall(**options):
+            sandbox.uninstall(target)
+            new_run(**options)
+
+        bench.measure(
+            "asdf_install (cold list-all)",
+            lambda: plugin.asdf_install(target),
+            setup=lambda: (sandbox.clear_cache(), uninstall()),
+        )
+        bench.measure(
+            "asdf_install (cached list-all)",
+            lambda: plugin.asdf_install(target),
+            setup=lambda: uninstall(),
+        )
+    return bench
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--installs", type=int, default=50, help="Installed versions")
+    parser.add_argument("--available", type=int, default=700, help="Installable versions")
+    parser.add_argument("--envs", type=int, default=12, help="Environments in the matrix")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark")
+    parser.add_argument("--json", metavar="FILE", help="Also write results as JSON")
+    args = parser.parse_args(argv)
+
+    bench = run(args)
+    bench.report()
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({"parameters": vars(args), "results": bench.results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,49 @@
+import json
 import os
+import shutil
 import subprocess
+import sys
 
 import pytest
 
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fake_python_info(python):
+    """Metadata as reported by a fake python install"""
+    return {
+        "executable": python,
+        "implementation": "CPython",
+        "version_info": [3, 6, 0, "final", 0],
+        "extra_version_info": None,
+        "is_64": True,
+        "sysplatform": "linux",
+        "os_sep": "/",
+        "machine": "x86_64",
+        "abiflags": "",
+        "paths": {},
+        "build": {"config_args": "", "py_debug": False, "py_gil_disabled": False},
+    }
+
+
+def fake_pythons(root, *versions, builds=None):
+    """
+    Write fake python installs of ``versions`` into ``root``.
+
+    Their interpreter is a shell script reporting its metadata,
+    updated with their entry in ``builds``.
+    """
+    if versions and sys.platform == "win32":
+        pytest.skip("The fake pythons are shell scripts")
+    for version in versions:
+        python = root / version / "bin" / "python"
+        python.parent.mkdir(parents=True)
+        info = fake_python_info(str(python))
+        info["build"].update((builds or {}).get(version, {}))
+        python.write_text("#!/bin/sh\necho '{}'\n".format(json.dumps(info)))
+        python.chmod(0o755)
+    return root
+
 
 class MockPopen(object):
     def __init__(self, args):
@@ -43,11 +84,15 @@ class Asdf:
         self.mocker = mocker
         self.pythons = pythons
         self.all_pythons = all_pythons
+        self.updated_pythons = None
         self.commands = {
             "list": self.list_python,
             "list-all": self.list_all_python,
             "where": self.where_python,
             "install": self.install_python,
+            "plugin": self.plugin_python,
+            "reshim": self.reshim_python,
+            "uninstall": self.uninstall_python,
         }
 
     def python_home(self, python):
@@ -65,7 +110,9 @@ class Asdf:
             cmd = [p.strip() for p in cmd.split()]
         cmd, args = cmd[0], cmd[1:]
 
-        if self.error_code and self.error_cmd is None:
+        if cmd.startswith(self.installs) and args[:1] == ["-c"]:
+            stdout, code = json.dumps(fake_python_info(cmd)), 0
+        elif self.error_code and self.error_cmd is None:
             code = self.error_code
             stderr = self.error_text
         elif cmd == "asdf" and not self.installed:
@@ -107,8 +154,34 @@ class Asdf:
     def where_python(self, *args):
         return self._asdf_call(args, 3, lambda a: self.python_home(a[2]))
 
+    def plugin_python(self, *args):
+        if args[1:] != ("update", "python"):
+            return self.invalid_command(*args)
+        if self.updated_pythons:
+            self.all_pythons = self.all_pythons | self.updated_pythons
+        return "", "", 0
+
     def install_python(self, *args):
-        return self._asdf_call(args, 3, lambda a: self.python_home(a[2]))
+        return self._asdf_call(args, 3, self.fake_install)
+
+    def fake_install(self, args):
+        home = self.python_home(args[2])
+        if os.path.isdir(self.installs):
+            bindir = os.path.join(home, "bin")
+            os.makedirs(bindir)
+            with open(os.path.join(bindir, "python"), "w") as f:
+                f.write("#!/bin/sh\n")
+        return home
+
+    def uninstall_python(self, *args):
+        return self._asdf_call(args, 3, self.fake_uninstall)
+
+    def fake_uninstall(self, args):
+        shutil.rmtree(self.python_home(args[2]), ignore_errors=True)
+        return ""
+
+    def reshim_python(self, *args):
+        return self._asdf_call(args, 3, lambda a: "")
 
 
 @pytest.fixture(name="asdf")
@@ -136,11 +209,65 @@ def mock_asdf(request, mocker):
         asdf.installed = False
     if request.node.get_closest_marker("asdf_python_missing"):
         asdf.plugin_installed = False
-    subprocess.Popen = asdf.popen
+    mocker.patch.object(subprocess, "Popen", asdf.popen)
 
     return asdf
 
 
+@pytest.fixture(name="popen")
+def spy_popen(asdf, mocker):
+    """Record the subprocesses run against the mocked asdf"""
+    popen = mocker.Mock(side_effect=asdf.popen)
+    mocker.patch.object(subprocess, "Popen", popen)
+    return popen
+
+
+@pytest.fixture(autouse=True)
+def isolate_asdf_data_dir(monkeypatch, tmp_path):
+    """Never look at the real asdf (nor mise or pyenv) installs"""
+    monkeypatch.setenv("ASDF_DATA_DIR", str(tmp_path / "missing-asdf"))
+    monkeypatch.setenv("MISE_DATA_DIR", str(tmp_path / "missing-mise"))
+    monkeypatch.setenv("PYENV_ROOT", str(tmp_path / "missing-pyenv"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+
+
+@pytest.fixture(autouse=True)
+def reset_run_state():
+    """Each test is a new tox run"""
+    from tox_asdf import plugin
+
+    plugin.RUN = plugin.RunState()
+
+
+@pytest.fixture(name="installs")
+def fake_installs(request, monkeypatch, tmp_path):
+    """Build a fake asdf data directory from the `pythons` marker"""
+    marker = request.node.get_closest_marker("pythons")
+    pythons = set(marker.args if marker and marker.args else [])
+    data_dir = tmp_path / "asdf"
+    root = data_dir / "installs" / "python"
+    root.mkdir(parents=True)
+    fake_pythons(root, *pythons)
+    monkeypatch.setenv("ASDF_DATA_DIR", str(data_dir))
+    return root
+
+
+@pytest.fixture(name="fake_asdf")
+def fake_asdf_program(installs, monkeypatch, tmp_path):
+    """Put a real (shell) fake asdf program serving `installs` in the PATH"""
+    if sys.platform == "win32":
+        pytest.skip("The fake asdf program is a shell script")
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    shutil.copy(os.path.join(ROOT, "benchmarks", "fake-asdf"), str(bindir / "asdf"))
+    log = tmp_path / "asdf.log"
+    log.write_text("")
+    monkeypatch.setenv("PATH", os.pathsep.join((str(bindir), os.environ["PATH"])))
+    monkeypatch.setenv("FAKE_ASDF_LOG", str(log))
+    return log
+
+
 @pytest.fixture(name="LOG")
 def mock_log(mocker):
     from tox_asdf import plugin
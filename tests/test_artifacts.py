@@ -0,0 +1,137 @@
+import os
+
+import pytest
+
+from tox_asdf import artifacts, plugin
+
+
+@pytest.fixture(name="install")
+def fake_install(tmp_path):
+    install = tmp_path / "installs" / "python" / "3.6.0"
+    (install / "bin").mkdir(parents=True)
+    (install / "bin" / "python3.6").write_text("#!/bin/sh\n")
+    (install / "bin" / "python").symlink_to("python3.6")
+    return install
+
+
+@pytest.fixture(name="store")
+def artifact_store(tmp_path):
+    return artifacts.ArtifactStore(str(tmp_path / "store"))
+
+
+class TestArtifactName:
+    def test_include_version_and_platform(self):
+        name = artifacts.artifact_name("3.6.0", {})
+        assert name.startswith("python-3.6.0-{}-".format(artifacts.platform_tag()))
+        assert name.endswith(".tar.gz")
+
+    def test_depends_on_options(self):
+        assert artifacts.artifact_name("3.6.0", {"CFLAGS": "-O3"}) != artifacts.artifact_name(
+            "3.6.0", {"CFLAGS": "-O2"}
+        )
+
+    def test_build_options(self):
+        env = {"PYTHON_CONFIGURE_OPTS": "--enable-shared", "MAKE_OPTS": "-j8", "CFLAGS": ""}
+        assert artifacts.build_options("/prefix", env) == {
+            "PYTHON_CONFIGURE_OPTS": "--enable-shared",
+            "prefix": "/prefix",
+        }
+
+
+class TestArtifactStore:
+    def test_roundtrip(self, store, install, tmp_path):
+        store.save("name.tar.gz", str(install))
+        assert store.has("name.tar.gz")
+        dest = tmp_path / "other" / "3.6.0"
+        assert store.restore("name.tar.gz", str(dest)) is True
+        assert (dest / "bin" / "python3.6").read_text() == "#!/bin/sh\n"
+        assert os.readlink(str(dest / "bin" / "python")) == "python3.6"
+        assert [p for p in os.listdir(str(tmp_path / "other"))] == ["3.6.0"]
+
+    def test_missing(self, store, tmp_path):
+        assert store.restore("name.tar.gz", str(tmp_path / "dest")) is False
+
+    def test_checksum_mismatch(self, store, install, tmp_path):
+        store.save("name.tar.gz", str(install))
+        with open(store.path("name.tar.gz"), "ab") as f:
+            f.write(b"corrupted")
+        with pytest.raises(artifacts.ChecksumMismatch):
+            store.restore("name.tar.gz", str(tmp_path / "dest"))
+        assert not (tmp_path / "dest").exists()
+
+    def test_no_leftover(self, store, install):
+        store.save("name.tar.gz", str(install))
+        assert sorted(os.listdir(store.root)) == ["name.tar.gz", "name.tar.gz.sha256"]
+
+
+class TestInstallWithArtifacts:
+    @pytest.fixture(autouse=True)
+    def setup(self, asdf, installs, store, CFG):
+        asdf.installs = str(installs.parent)
+        CFG.artifacts = store.root
+
+    def commands(self, popen):
+        return [c[0][0] for c in popen.call_args_list]
+
+    def test_store_built_version(self, installs, store, popen):
+        assert plugin.asdf_install_version("3.6.0") == "3.6.0"
+        assert self.commands(popen) == ["asdf install python 3.6.0"]
+        name = artifacts.artifact_name("3.6.0", artifacts.build_options(str(installs / "3.6.0")))
+        assert store.has(name)
+
+    def test_restore_instead_of_build(self, installs, popen):
+        plugin.asdf_install_version("3.6.0")
+        (installs / "3.6.0" / "bin" / "python").unlink()
+        (installs / "3.6.0" / "bin").rmdir()
+        (installs / "3.6.0").rmdir()
+        popen.reset_mock()
+        assert plugin.asdf_install_version("3.6.0") == "3.6.0"
+        assert self.commands(popen) == ["asdf reshim python 3.6.0"]
+        assert (installs / "3.6.0" / "bin" / "python").exists()
+        leftovers = [name for name in os.listdir(str(installs)) if not name.endswith(".lock")]
+        assert leftovers == ["3.6.0"]
+
+    def test_build_on_corrupted_artifact(self, installs, store, popen, LOG):
+        plugin.asdf_install_version("3.6.0")
+        name = artifacts.artifact_name("3.6.0", artifacts.build_options(str(installs / "3.6.0")))
+        with open(store.path(name), "ab") as f:
+            f.write(b"corrupted")
+        popen.reset_mock()
+        (installs / "3.6.0" / "bin" / "python").unlink()
+        (installs / "3.6.0" / "bin").rmdir()
+        (installs / "3.6.0").rmdir()
+        assert plugin.asdf_install_version("3.6.0") == "3.6.0"
+        assert self.commands(popen) == ["asdf install python 3.6.0"]
+        LOG.warning.assert_called_once()
+
+    def uninstall(self, installs):
+        (installs / "3.6.0" / "bin" / "python").unlink()
+        (installs / "3.6.0" / "bin").rmdir()
+        (installs / "3.6.0").rmdir()
+
+    def test_deferred_reshim(self, installs, popen, CFG):
+        CFG.reshim = "deferred"
+        plugin.asdf_install_version("3.6.0")
+        self.uninstall(installs)
+        popen.reset_mock()
+        plugin.asdf_install_version("3.6.0")
+        assert self.commands(popen) == []
+        plugin.tox_cleanup(None)
+        assert self.commands(popen) == ["asdf reshim python"]
+
+    def test_never_reshim(self, installs, popen, CFG):
+        CFG.reshim = "never"
+        plugin.asdf_install_version("3.6.0")
+        self.uninstall(installs)
+        popen.reset_mock()
+        plugin.asdf_install_version("3.6.0")
+        plugin.tox_cleanup(None)
+        assert self.commands(popen) == []
+
+    def test_artifact_per_build_profile(self, installs, popen, CFG):
+        plugin.asdf_install_version("3.6.0")
+        self.uninstall(installs)
+        popen.reset_mock()
+        CFG.build_profile = "optimized"
+        plugin.asdf_install_version("3.6.0")
+        assert self.commands(popen) == ["asdf install python 3.6.0"]
@@ -1,4 +1,10 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
 import pytest
+import tox.exception
 
 from tox_asdf import plugin
 
@@ -83,3 +89,382 @@ class TestAsdfInstall:
         best_version = mocker.patch.object(plugin, "best_version", return_value="result")
         assert plugin.asdf_install("3.6") == "result"
         best_version.assert_called_once_with("3.6", mocker.ANY)
+
+
+class TestInstallCoordination:
+    @pytest.fixture(autouse=True)
+    def setup(self, asdf, installs):
+        asdf.installs = str(installs.parent)
+
+    def test_remove_marker_on_success(self, installs):
+        assert plugin.asdf_install_version("3.6.0") == "3.6.0"
+        assert (installs / "3.6.0" / "bin" / "python").exists()
+        assert not (installs / ".3.6.0.tox-asdf-installing").exists()
+
+    @pytest.mark.asdf_error("install", 1, "build failed")
+    def test_keep_marker_on_failure(self, installs):
+        with pytest.raises(plugin.AsdfError):
+            plugin.asdf_install_version("3.6.0")
+        assert (installs / ".3.6.0.tox-asdf-installing").exists()
+
+    @pytest.mark.pythons("3.6.0")
+    def test_skip_installed_by_another_process(self, installs, popen):
+        assert plugin.asdf_install_version("3.6.0") == "3.6.0"
+        popen.assert_not_called()
+
+    @pytest.mark.pythons("3.6.0")
+    def test_cleanup_interrupted_install(self, installs, popen):
+        (installs / ".3.6.0.tox-asdf-installing").write_text("")
+        (installs / "3.6.0" / "partial").write_text("")
+        assert plugin.asdf_install_version("3.6.0") == "3.6.0"
+        assert [c[0][0] for c in popen.call_args_list] == ["asdf install python 3.6.0"]
+        assert not (installs / "3.6.0" / "partial").exists()
+        assert not (installs / ".3.6.0.tox-asdf-installing").exists()
+
+    @pytest.mark.skipif(plugin.fcntl is None, reason="Requires fcntl")
+    def test_wait_for_concurrent_install(self, installs, popen):
+        lock = open(str(installs / ".3.6.0.tox-asdf.lock"), "a")
+        plugin.fcntl.flock(lock, plugin.fcntl.LOCK_EX)
+        with ThreadPoolExecutor(1) as executor:
+            future = executor.submit(plugin.asdf_install_version, "3.6.0")
+            time.sleep(0.1)
+            assert not future.done()
+            # The lock holder completes the install
+            bindir = installs / "3.6.0" / "bin"
+            bindir.mkdir(parents=True)
+            (bindir / "python").write_text("")
+            (bindir / "python").chmod(0o755)
+            plugin.fcntl.flock(lock, plugin.fcntl.LOCK_UN)
+            lock.close()
+            assert future.result() == "3.6.0"
+        popen.assert_not_called()
+
+    @pytest.mark.parametrize("resolver", ["fs", "cli"])
+    @pytest.mark.pythons("3.6.0", "3.6.1")
+    def test_resolvers_ignore_incomplete(self, installs, resolver, CFG):
+        (installs / ".3.6.1.tox-asdf-installing").write_text("")
+        CFG.resolver = resolver
+        get_installed, _ = plugin.get_resolver()
+        assert get_installed("3.6") == "3.6.0"
+
+
+def is_alive(pid):
+    """Whether a process is running (a not yet reaped zombie is not)"""
+    try:
+        with open("/proc/{}/stat".format(pid)) as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+class TestRunShell:
+    def test_timeout(self, LOG):
+        with pytest.raises(plugin.AsdfTimeout):
+            plugin.run_shell("exec sleep 5", timeout=0.1, retries=1)
+        assert LOG.warning.call_count == 2
+        assert plugin.RUN.timings.summary()["subprocess"]["count"] == 2
+
+    @pytest.mark.skipif(not hasattr(os, "killpg"), reason="Requires process groups")
+    def test_timeout_kills_subprocesses(self, tmp_path):
+        pidfile = tmp_path / "sleep.pid"
+        with pytest.raises(plugin.AsdfTimeout):
+            plugin.run_shell("sleep 30 & echo $! > {}; wait".format(pidfile), timeout=0.5)
+        pid = int(pidfile.read_text())
+        deadline = time.time() + 5
+        while is_alive(pid) and time.time() < deadline:
+            time.sleep(0.01)
+        assert not is_alive(pid)
+
+    def test_within_timeout(self):
+        assert plugin.run_shell("echo ok", timeout=5, retries=1) == "ok\n"
+
+    def test_install_not_retried(self, mocker, CFG):
+        run_shell = mocker.patch.object(plugin, "run_shell")
+        CFG.install_timeout = 3600
+        plugin.run_asdf("install python 3.6.0", capture=False)
+        plugin.run_asdf("list python")
+        assert run_shell.call_args_list[0][1]["timeout"] == 3600
+        assert run_shell.call_args_list[0][1]["retries"] == 0
+        assert run_shell.call_args_list[1][1]["timeout"] == CFG.timeout
+        assert run_shell.call_args_list[1][1]["retries"] == CFG.retries
+
+    def test_parse_settings(self):
+        config = plugin.Config()
+        config.timeout = None  # No --asdf-timeout
+        settings = {"timeout": "30", "install_timeout": "1800", "retries": "2"}
+        plugin.parse_config_options({"asdf": settings}, config)
+        assert (config.timeout, config.install_timeout, config.retries) == (30, 1800, 2)
+
+    @pytest.mark.parametrize(
+        "key,value",
+        [("timeout", "30s"), ("retries", "two"), ("gc_max_size", "20 gigs"), ("list_all_ttl", "")],
+    )
+    def test_invalid_setting(self, key, value):
+        config = plugin.Config()
+        config.timeout = None
+        with pytest.raises(tox.exception.ConfigError, match=key):
+            plugin.parse_config_options({"asdf": {key: value}}, config)
+
+
+class TestCircuitBreaker:
+    @pytest.mark.asdf_missing
+    def test_asdf_missing(self, popen):
+        for _ in range(3):
+            with pytest.raises(plugin.AsdfMissing):
+                plugin.run_asdf("list python")
+        popen.assert_called_once()
+
+    @pytest.mark.asdf_python_missing
+    def test_plugin_missing(self, popen):
+        with pytest.raises(plugin.AsdfPluginMissing):
+            plugin.run_asdf("list python")
+        with pytest.raises(plugin.AsdfPluginMissing):
+            plugin.run_asdf("list-all python")
+        popen.assert_called_once()
+
+    @pytest.mark.asdf_error(42, "Unknown error")
+    def test_not_fatal(self, popen):
+        for _ in range(2):
+            with pytest.raises(plugin.AsdfError):
+                plugin.run_asdf("list python")
+        assert popen.call_count == 2
+
+    @pytest.mark.asdf_missing
+    def test_log_once(self, popen, LOG, CFG):
+        CFG.cache = False
+        CFG.resolver = "cli"
+        assert plugin.get_python_executable("python3.6") is None
+        assert plugin.get_python_executable("python3.7") is None
+        LOG.error.assert_called_once()
+        popen.assert_called_once()
+
+
+class TestBuildProfiles:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch, mocker):
+        monkeypatch.setenv("PYTHON_CONFIGURE_OPTS", "--enable-shared --enable-optimizations")
+        mocker.patch("os.cpu_count", return_value=8)
+
+    def test_default(self):
+        assert plugin.build_env("default") is None
+
+    def test_fast_build(self):
+        plugin.RUN.install_jobs = 2
+        env = plugin.build_env("fast-build")
+        assert env["PYTHON_CONFIGURE_OPTS"] == "--enable-shared --disable-test-modules"
+        assert env["MAKE_OPTS"] == "-j4"
+
+    def test_optimized(self):
+        env = plugin.build_env("optimized")
+        options = "--enable-shared --enable-optimizations --with-lto"
+        assert env["PYTHON_CONFIGURE_OPTS"] == options
+        assert env["MAKE_OPTS"] == "-j8"
+
+    def test_version_build_profile(self, CFG):
+        CFG.build_profile = "fast-build"
+        plugin.RUN.build_profiles = {"3.12": "optimized"}
+        assert plugin.version_build_profile("3.12.1") == "optimized"
+        assert plugin.version_build_profile("3.1.2") == "fast-build"
+
+    def test_install_with_profile(self, asdf, mocker, CFG):
+        CFG.build_profile = "optimized"
+        run_shell = mocker.spy(plugin, "run_shell")
+        plugin.asdf_install_version("3.6.0")
+        env = run_shell.call_args[1]["env"]
+        assert "--with-lto" in env["PYTHON_CONFIGURE_OPTS"]
+
+    def test_envs_build_profiles(self, LOG):
+        envconfigs = [
+            SimpleNamespace(
+                envname="bench", basepython="python3.12", asdf_build_profile="optimized"
+            ),
+            SimpleNamespace(envname="py312", basepython="python3.12", asdf_build_profile=None),
+            SimpleNamespace(
+                envname="fast", basepython="python3.12", asdf_build_profile="fast-build"
+            ),
+        ]
+        plugin.parse_envs_build_profiles(envconfigs)
+        assert plugin.RUN.build_profiles == {"3.12": "optimized"}
+        LOG.warning.assert_called_once()
+
+    def test_invalid_profile(self):
+        with pytest.raises(tox.exception.ConfigError):
+            plugin.parse_config_options({"asdf": {"build_profile": "fastest"}}, plugin.Config())
+
+
+class TestAsdfDataDir:
+    def test_asdf_data_dir(self, monkeypatch):
+        monkeypatch.setenv("ASDF_DATA_DIR", "/data")
+        monkeypatch.setenv("ASDF_DIR", "/asdf")
+        assert plugin.asdf_data_dir() == "/data"
+
+    def test_default_to_home(self, monkeypatch, tmp_path):
+        monkeypatch.delenv("ASDF_DATA_DIR")
+        monkeypatch.delenv("ASDF_DIR", raising=False)
+        monkeypatch.setenv("HOME", str(tmp_path))
+        assert plugin.asdf_data_dir() == str(tmp_path / ".asdf")
+
+    def test_fallback_on_asdf_dir(self, monkeypatch, tmp_path):
+        monkeypatch.delenv("ASDF_DATA_DIR")
+        monkeypatch.setenv("ASDF_DIR", "/asdf")
+        monkeypatch.setenv("HOME", str(tmp_path))
+        assert plugin.asdf_data_dir() == "/asdf"
+
+
+class TestFsGetInstalled:
+    @pytest.mark.pythons("2.7.15", "3.6.0", "3.6.1", "pypy3.8-7.0.0")
+    def test_return_best_version(self, installs):
+        assert plugin.fs_get_installed("3.6") == "3.6.1"
+
+    @pytest.mark.pythons("2.7.15", "pypy3.8-7.0.0")
+    def test_return_pypy_version(self, installs):
+        assert plugin.fs_get_installed("pypy3.8") == "pypy3.8-7.0.0"
+
+    @pytest.mark.pythons("2.7.15")
+    def test_ignore_files(self, installs):
+        (installs / "3.6.0").write_text("")
+        assert plugin.fs_get_installed("3.6") is None
+
+    def test_missing_installs(self):
+        with pytest.raises(plugin.AsdfError):
+            plugin.fs_get_installed("3.6")
+
+    @pytest.mark.pythons("3.6.0")
+    def test_do_not_spawn_asdf(self, installs, mocker):
+        popen = mocker.patch("subprocess.Popen")
+        assert plugin.fs_get_installed("3.6") == "3.6.0"
+        popen.assert_not_called()
+
+
+class TestFsWhich:
+    @pytest.mark.pythons("3.6.0")
+    def test_matching_version(self, installs):
+        assert plugin.fs_which("3.6.0") == str(installs / "3.6.0" / "bin" / "python")
+
+    @pytest.mark.pythons("3.6.0")
+    def test_missing_executable(self, installs):
+        with pytest.raises(plugin.AsdfError):
+            plugin.fs_which("3.7.0")
+
+
+class TestGetResolver:
+    def test_auto_without_installs(self):
+        assert plugin.get_resolver() == (plugin.asdf_get_installed, plugin.asdf_which)
+
+    def test_auto_with_installs(self, installs):
+        assert plugin.get_resolver() == (plugin.fs_get_installed, plugin.fs_which)
+
+    def test_force_cli(self, installs, CFG):
+        CFG.resolver = "cli"
+        assert plugin.get_resolver() == (plugin.asdf_get_installed, plugin.asdf_which)
+
+    def test_force_fs(self, CFG):
+        CFG.resolver = "fs"
+        assert plugin.get_resolver() == (plugin.fs_get_installed, plugin.fs_which)
+
+
+class TestAvailableVersions:
+    def list_all_calls(self, popen):
+        return [c for c in popen.call_args_list if c[0][0] == "asdf list-all python"]
+
+    @pytest.mark.all_pythons("3.6.0")
+    def test_list_once_per_run(self, popen):
+        assert list(plugin.available_versions()) == ["3.6.0"]
+        assert list(plugin.available_versions()) == ["3.6.0"]
+        assert len(self.list_all_calls(popen)) == 1
+
+    @pytest.mark.all_pythons("3.6.0")
+    def test_cached_across_runs(self, popen):
+        plugin.available_versions()
+        plugin.RUN = plugin.RunState()
+        assert list(plugin.available_versions()) == ["3.6.0"]
+        assert len(self.list_all_calls(popen)) == 1
+
+    @pytest.mark.all_pythons("3.6.0")
+    def test_expired(self, popen, CFG):
+        CFG.list_all_ttl = -1
+        plugin.available_versions()
+        plugin.RUN = plugin.RunState()
+        plugin.available_versions()
+        assert len(self.list_all_calls(popen)) == 2
+
+    @pytest.mark.all_pythons("3.6.0")
+    def test_offline_ignore_ttl(self, popen, CFG):
+        CFG.list_all_ttl = -1
+        CFG.offline = True
+        plugin.available_versions()
+        plugin.RUN = plugin.RunState()
+        plugin.available_versions()
+        assert len(self.list_all_calls(popen)) == 1
+
+    @pytest.mark.all_pythons("3.6.0")
+    def test_no_cache(self, popen, CFG):
+        CFG.cache = False
+        plugin.available_versions()
+        plugin.RUN = plugin.RunState()
+        plugin.available_versions()
+        assert len(self.list_all_calls(popen)) == 2
+
+
+class TestRefreshAvailableVersions:
+    @pytest.mark.all_pythons("3.6.0")
+    def test_update_plugin_on_unknown_version(self, asdf):
+        asdf.updated_pythons = {"3.7.0"}
+        plugin.available_versions()
+        assert plugin.asdf_install("3.7") == "3.7.0"
+
+    @pytest.mark.all_pythons("3.6.0")
+    def test_throttled(self, asdf, mocker):
+        update = mocker.spy(plugin, "asdf_plugin_update")
+        assert list(plugin.refresh_available_versions()) == ["3.6.0"]
+        plugin.RUN = plugin.RunState()
+        assert plugin.refresh_available_versions() is None
+        update.assert_called_once()
+
+    @pytest.mark.all_pythons("3.6.0")
+    def test_offline(self, asdf, mocker, CFG):
+        CFG.offline = True
+        update = mocker.spy(plugin, "asdf_plugin_update")
+        assert plugin.refresh_available_versions() is None
+        update.assert_not_called()
+
+    @pytest.mark.asdf_error("plugin", 42, "Unknown error")
+    def test_update_error(self, asdf, LOG):
+        assert plugin.refresh_available_versions() is None
+        LOG.warning.assert_called_once()
+
+
+class TestBatch:
+    @pytest.mark.pythons("2.7.15", "3.6.0", "3.6.1", "pypy3.8-7.0.0")
+    def test_resolve_with_a_single_subprocess(self, fake_asdf, installs):
+        assert plugin.batch_get_installed("3.6") == "3.6.1"
+        assert plugin.batch_get_installed("pypy3") == "pypy3.8-7.0.0"
+        assert plugin.batch_which("3.6.1") == str(installs / "3.6.1" / "bin" / "python")
+        assert plugin.batch_which("2.7.15") == str(installs / "2.7.15" / "bin" / "python")
+        assert len(plugin.RUN.timings.commands) == 1
+        assert fake_asdf.read_text().splitlines() == ["list python", "where python 2.7.15"]
+
+    def test_no_python(self, fake_asdf):
+        assert plugin.batch_get_installed("3.6") is None
+
+    def test_asdf_missing(self, fake_asdf, monkeypatch, tmp_path):
+        monkeypatch.setenv("PATH", str(tmp_path / "empty"))
+        with pytest.raises(plugin.AsdfMissing):
+            plugin.batch_get_installed("3.6")
+
+    def test_asdf_python_plugin_missing(self, fake_asdf, monkeypatch):
+        monkeypatch.setenv("FAKE_ASDF_NO_PLUGIN", "1")
+        with pytest.raises(plugin.AsdfPluginMissing):
+            plugin.batch_get_installed("3.6")
+
+    def test_fallback_on_asdf_where(self, asdf):
+        assert plugin.batch_which("3.6.0") == asdf.python_bin("3.6.0")
+
+    def test_resolver(self, CFG):
+        CFG.resolver = "batch"
+        assert plugin.get_resolver() == (plugin.batch_get_installed, plugin.batch_which)
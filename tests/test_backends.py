@@ -0,0 +1,115 @@
+import os
+
+import pytest
+import tox.exception
+from conftest import fake_pythons
+
+from tox_asdf import backends, plugin
+
+
+@pytest.fixture(name="mise")
+def fake_mise_installs(monkeypatch, tmp_path):
+    monkeypatch.setenv("MISE_DATA_DIR", str(tmp_path / "mise"))
+    return fake_pythons(tmp_path / "mise" / "installs" / "python", "3.11.7", "3.12.1")
+
+
+@pytest.fixture(name="pyenv")
+def fake_pyenv_versions(monkeypatch, tmp_path):
+    monkeypatch.setenv("PYENV_ROOT", str(tmp_path / "pyenv"))
+    return fake_pythons(tmp_path / "pyenv" / "versions", "3.10.13", "3.12.0")
+
+
+class TestSelectBackend:
+    def test_default_to_asdf(self):
+        assert plugin.get_backend().name == "asdf"
+
+    @pytest.mark.pythons("3.6.0")
+    def test_auto_prefers_asdf(self, installs, mise, pyenv):
+        assert plugin.get_backend().name == "asdf"
+
+    def test_auto_mise(self, mise, pyenv):
+        assert plugin.get_backend().name == "mise"
+
+    def test_auto_pyenv(self, pyenv):
+        assert plugin.get_backend().name == "pyenv"
+
+    def test_auto_directory(self, mise, CFG, tmp_path):
+        CFG.pythons_dir = str(fake_pythons(tmp_path / "pythons", "3.9.18"))
+        backend = plugin.get_backend()
+        assert backend.name == "directory"
+        assert backend.installs == CFG.pythons_dir
+
+    def test_configured(self, mise, CFG):
+        CFG.backend = "pyenv"
+        assert plugin.get_backend().name == "pyenv"
+
+    def test_selected_once_per_run(self, mocker):
+        select = mocker.spy(backends, "select_backend")
+        plugin.get_backend()
+        plugin.get_backend()
+        select.assert_called_once()
+
+    def test_directory_requires_pythons_dir(self):
+        with pytest.raises(tox.exception.ConfigError):
+            plugin.parse_config_options({"asdf": {"backend": "directory"}}, plugin.Config())
+
+    def test_invalid_backend(self):
+        with pytest.raises(tox.exception.ConfigError):
+            plugin.parse_config_options({"asdf": {"backend": "conda"}}, plugin.Config())
+
+
+class TestResolve:
+    def test_mise(self, mise):
+        python = plugin.get_python_executable("python3.12")
+        assert python == str(mise / "3.12.1" / "bin" / "python")
+
+    def test_mise_ignore_aliases(self, mise):
+        os.symlink("3.11.7", str(mise / "3.13"))
+        assert sorted(plugin.get_backend().list_installed()) == ["3.11.7", "3.12.1"]
+
+    def test_pyenv(self, pyenv):
+        python = plugin.get_python_executable("python3")
+        assert python == str(pyenv / "3.12.0" / "bin" / "python")
+
+    def test_directory(self, CFG, tmp_path):
+        pythons = fake_pythons(tmp_path / "pythons", "3.9.18")
+        CFG.backend = "directory"
+        CFG.pythons_dir = str(pythons)
+        python = plugin.get_python_executable("python3.9")
+        assert python == str(pythons / "3.9.18" / "bin" / "python")
+
+    def test_missing(self, pyenv, CFG):
+        assert plugin.get_python_executable("python3.8") is None
+        CFG.no_fallback = True
+        with pytest.raises(plugin.AsdfError):
+            plugin.get_python_executable("python3.8")
+
+
+class TestInstall:
+    def test_pyenv_install(self, pyenv, mocker, CFG):
+        CFG.cache = False
+        run_shell = mocker.patch.object(
+            plugin, "run_shell", return_value="Available versions:\n  3.8.18\n  3.12.0\n"
+        )
+        assert plugin.asdf_install("3.8") == "3.8.18"
+        assert run_shell.call_args_list[0][0] == ("pyenv install --list",)
+        assert run_shell.call_args_list[1][0] == ("pyenv install --skip-existing 3.8.18",)
+        assert run_shell.call_args_list[1][1]["timeout"] == CFG.install_timeout
+
+    def test_mise_install(self, mise, mocker, CFG):
+        CFG.cache = False
+        run_shell = mocker.patch.object(plugin, "run_shell", return_value="3.8.18\n3.12.1\n")
+        assert plugin.asdf_install("3.8") == "3.8.18"
+        assert run_shell.call_args_list[0][0] == ("mise ls-remote python",)
+        assert run_shell.call_args_list[1][0] == ("mise install python@3.8.18",)
+
+    def test_directory_cannot_install(self, CFG, tmp_path):
+        CFG.backend = "directory"
+        CFG.pythons_dir = str(tmp_path)
+        CFG.install = True
+        assert plugin.get_python_executable("python3.8") is None
+
+    def test_program_missing(self, mise, monkeypatch, tmp_path):
+        monkeypatch.setenv("PATH", str(tmp_path))
+        with pytest.raises(plugin.AsdfMissing, match="mise is not installed"):
+            plugin.get_backend().list_all()
@@ -0,0 +1,117 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tox_asdf import cache
+
+
+@pytest.fixture(name="python")
+def fake_python(tmp_path):
+    python = tmp_path / "installs" / "3.6.0" / "bin" / "python"
+    python.parent.mkdir(parents=True)
+    python.write_text("")
+    return python
+
+
+def test_default_cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert cache.default_cache_dir() == str(tmp_path / "tox-asdf")
+
+
+def test_default_cache_dir_without_xdg(monkeypatch, tmp_path):
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    assert cache.default_cache_dir() == str(tmp_path / ".cache" / "tox-asdf")
+
+
+def test_fingerprint_missing(tmp_path):
+    assert cache.fingerprint(str(tmp_path / "missing")) is None
+
+
+def test_fingerprint_change(python):
+    before = cache.fingerprint(str(python))
+    python.write_text("changed")
+    assert cache.fingerprint(str(python)) != before
+
+
+class TestResolutionCache:
+    def test_miss(self, tmp_path, python):
+        resolutions = cache.ResolutionCache(str(tmp_path / "cache"))
+        assert resolutions.get(str(tmp_path / "installs"), "3.6") is None
+
+    def test_hit(self, tmp_path, python):
+        installs = str(tmp_path / "installs")
+        cache.ResolutionCache(str(tmp_path / "cache")).set(installs, "3.6", str(python))
+        resolutions = cache.ResolutionCache(str(tmp_path / "cache"))
+        assert resolutions.get(installs, "3.6") == str(python)
+
+    def test_invalidated_by_installs_change(self, tmp_path, python):
+        installs = tmp_path / "installs"
+        resolutions = cache.ResolutionCache(str(tmp_path / "cache"))
+        resolutions.set(str(installs), "3.6", str(python))
+        (installs / "3.6.1").mkdir()
+        os.utime(str(installs), ns=(0, 0))
+        assert resolutions.get(str(installs), "3.6") is None
+
+    def test_invalidated_by_python_change(self, tmp_path, python):
+        installs = str(tmp_path / "installs")
+        resolutions = cache.ResolutionCache(str(tmp_path / "cache"))
+        resolutions.set(installs, "3.6", str(python))
+        python.write_text("rebuilt")
+        assert resolutions.get(installs, "3.6") is None
+
+    def test_ignore_corrupted_file(self, tmp_path, python):
+        (tmp_path / "cache").mkdir()
+        (tmp_path / "cache" / cache.ResolutionCache.FILENAME).write_text("not json")
+        resolutions = cache.ResolutionCache(str(tmp_path / "cache"))
+        assert resolutions.get(str(tmp_path / "installs"), "3.6") is None
+
+    def test_persisted_as_json(self, tmp_path, python):
+        installs = str(tmp_path / "installs")
+        cache.ResolutionCache(str(tmp_path / "cache")).set(installs, "3.6", str(python))
+        with open(str(tmp_path / "cache" / cache.ResolutionCache.FILENAME)) as f:
+            data = json.load(f)
+        assert data[installs]["versions"]["3.6"]["python"] == str(python)
+
+    def test_concurrent_set(self, tmp_path, python):
+        installs = str(tmp_path / "installs")
+        resolutions = cache.ResolutionCache(str(tmp_path / "cache"))
+        versions = ["3.6.{}".format(i) for i in range(200)]
+        with ThreadPoolExecutor(16) as executor:
+            for future in [
+                executor.submit(resolutions.set, installs, version, str(python))
+                for version in versions
+            ]:
+                future.result()
+        resolutions = cache.ResolutionCache(str(tmp_path / "cache"))
+        assert all(resolutions.get(installs, version) == str(python) for version in versions)
+
+
+class TestInterpreterInfoCache:
+    def test_hit(self, tmp_path, python):
+        cache.InterpreterInfoCache(str(tmp_path / "cache")).set(str(python), {"key": "value"})
+        infos = cache.InterpreterInfoCache(str(tmp_path / "cache"))
+        assert infos.get(str(python)) == {"key": "value"}
+
+    def test_miss(self, tmp_path, python):
+        assert cache.InterpreterInfoCache(str(tmp_path / "cache")).get(str(python)) is None
+
+    def test_invalidated_by_python_change(self, tmp_path, python):
+        infos = cache.InterpreterInfoCache(str(tmp_path / "cache"))
+        infos.set(str(python), {"key": "value"})
+        python.write_text("rebuilt")
+        assert infos.get(str(python)) is None
+
+    def test_concurrent_set(self, tmp_path):
+        pythons = []
+        for i in range(200):
+            pythons.append(tmp_path / "python{}".format(i))
+            pythons[-1].write_text("")
+        infos = cache.InterpreterInfoCache(str(tmp_path / "cache"))
+        with ThreadPoolExecutor(16) as executor:
+            for future in [executor.submit(infos.set, str(p), {"key": "value"}) for p in pythons]:
+                future.result()
+        infos = cache.InterpreterInfoCache(str(tmp_path / "cache"))
+        assert all(infos.get(str(p)) == {"key": "value"} for p in pythons)
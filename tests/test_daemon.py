@@ -0,0 +1,117 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+import pytest
+
+from tox_asdf import daemon, plugin
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Requires Unix sockets")
+
+
+@pytest.fixture(name="socket_path")
+def short_socket_path(CFG):
+    # Unix sockets paths are limited to ~100 characters
+    root = tempfile.mkdtemp(prefix="tox-asdf-")
+    CFG.daemon_socket = os.path.join(root, "tox-asdf.sock")
+    yield CFG.daemon_socket
+    shutil.rmtree(root, ignore_errors=True)
+
+
+@pytest.fixture(name="server")
+def running_daemon(socket_path):
+    server = daemon.ResolverDaemon(socket_path)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01})
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.mark.parametrize("watch", [daemon.InotifyWatcher, daemon.StatWatcher])
+def test_watcher(tmp_path, watch):
+    try:
+        watcher = watch(str(tmp_path))
+    except OSError:
+        pytest.skip("inotify is not available")
+    assert not watcher.changed()
+    (tmp_path / "3.6.0").mkdir()
+    assert watcher.changed()
+    watcher.close()
+
+
+class TestResolverDaemon:
+    @pytest.mark.pythons("3.6.0", "3.6.1", "3.7.0")
+    def test_resolve(self, installs, server):
+        assert plugin.daemon_query(installs=str(installs), version="3.6") == {"version": "3.6.1"}
+
+    @pytest.mark.pythons("3.6.0")
+    def test_no_match(self, installs, server):
+        assert plugin.daemon_query(installs=str(installs), version="3.7") == {"version": None}
+
+    @pytest.mark.pythons("3.6.0")
+    def test_follow_installs(self, installs, server):
+        assert plugin.daemon_query(installs=str(installs), version="3.6")["version"] == "3.6.0"
+        (installs / "3.6.1").mkdir()
+        assert plugin.daemon_query(installs=str(installs), version="3.6")["version"] == "3.6.1"
+        (installs / ".3.6.1.tox-asdf-installing").write_text("")
+        assert plugin.daemon_query(installs=str(installs), version="3.6")["version"] == "3.6.0"
+
+    def test_missing_installs(self, tmp_path, server):
+        with pytest.raises(plugin.AsdfError):
+            plugin.daemon_query(installs=str(tmp_path / "missing"), version="3.6")
+
+    def test_cleanup_socket(self, socket_path):
+        server = daemon.ResolverDaemon(socket_path)
+        server.server_close()
+        assert not os.path.exists(socket_path)
+
+    def test_replace_stale_socket(self, socket_path):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(socket_path)
+        server = daemon.ResolverDaemon(socket_path)
+        assert daemon.is_listening(socket_path)
+        server.server_close()
+
+    @pytest.mark.pythons("3.6.0")
+    def test_keep_running_daemon_socket(self, installs, server, socket_path):
+        with pytest.raises(plugin.AsdfError, match="already listening"):
+            daemon.ResolverDaemon(socket_path)
+        assert plugin.daemon_query(installs=str(installs), version="3.6") == {"version": "3.6.0"}
+
+    def test_error_with_braces(self, tmp_path, server):
+        with pytest.raises(plugin.AsdfError, match=r"\{weird\}"):
+            plugin.daemon_query(installs=str(tmp_path / "{weird}"), version="3.6")
+
+
+class TestDaemonResolver:
+    @pytest.mark.pythons("3.6.0", "3.6.1")
+    def test_resolve_with_daemon(self, installs, server, mocker):
+        scan = mocker.spy(plugin, "fs_get_installed")
+        assert plugin.daemon_get_installed("3.6") == "3.6.1"
+        scan.assert_not_called()
+
+    @pytest.mark.pythons("3.6.0", "3.6.1")
+    def test_fallback_without_daemon(self, installs, socket_path, mocker):
+        lookup = mocker.spy(plugin, "daemon_socket")
+        assert plugin.daemon_get_installed("3.6") == "3.6.1"
+        assert plugin.daemon_get_installed("3.6") == "3.6.1"
+        assert plugin.RUN.daemon_down
+        assert lookup.call_count == 1
+
+    @pytest.mark.pythons("3.6.0")
+    def test_auto_with_socket(self, installs, server):
+        assert plugin.get_resolver() == (plugin.daemon_get_installed, plugin.fs_which)
+
+    @pytest.mark.pythons("3.6.0")
+    def test_auto_without_socket(self, installs, socket_path):
+        assert plugin.get_resolver() == (plugin.fs_get_installed, plugin.fs_which)
+
+    @pytest.mark.pythons("3.6.0")
+    def test_executable(self, installs, server, CFG):
+        CFG.cache = False
+        python = plugin.get_python_executable("python3.6")
+        assert python == str(installs / "3.6.0" / "bin" / "python")
@@ -0,0 +1,69 @@
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from tox_asdf import discovery
+
+
+def options(*pythons):
+    return SimpleNamespace(python=list(pythons), env={}, app_data=None, try_first_with=[])
+
+
+@pytest.mark.parametrize(
+    "spec, basepython",
+    [
+        ("3", "python3"),
+        ("3.11", "python3.11"),
+        ("3.11.2", "python3.11.2"),
+        ("py311", "python3.11"),
+        ("py3.11", "python3.11"),
+        ("python3.11", "python3.11"),
+        ("cpython3.11", "python3.11"),
+        ("pypy", "pypy"),
+        ("pypy3", "pypy3"),
+        ("/usr/bin/python3", None),
+        ("jython", None),
+    ],
+)
+def test_basepython_from_spec(spec, basepython):
+    assert discovery.basepython_from_spec(spec) == basepython
+
+
+class TestAsdfDiscovery:
+    @pytest.fixture(name="get_interpreter")
+    def mock_get_interpreter(self, mocker):
+        return mocker.patch.object(discovery, "get_interpreter", return_value="interpreter")
+
+    @pytest.mark.pythons("3.6.0", "3.11.2")
+    def test_asdf_interpreter(self, installs, get_interpreter, mocker):
+        builtin = mocker.patch.object(discovery.Builtin, "run")
+        assert discovery.AsdfDiscovery(options("py311")).run() == "interpreter"
+        python = str(installs / "3.11.2" / "bin" / "python")
+        get_interpreter.assert_called_once_with(python, [], app_data=None, env={})
+        builtin.assert_not_called()
+
+    @pytest.mark.pythons("3.6.0")
+    def test_first_matching_spec(self, installs, get_interpreter):
+        assert discovery.AsdfDiscovery(options("3.11", "3.6")).run() == "interpreter"
+        python = str(installs / "3.6.0" / "bin" / "python")
+        get_interpreter.assert_called_once_with(python, [], app_data=None, env={})
+
+    @pytest.mark.pythons("3.6.0")
+    def test_fallback_on_builtin(self, installs, get_interpreter, mocker):
+        builtin = mocker.patch.object(discovery.Builtin, "run", return_value="builtin")
+        assert discovery.AsdfDiscovery(options("3.11")).run() == "builtin"
+        get_interpreter.assert_not_called()
+        builtin.assert_called_once()
+
+    def test_fallback_on_error(self, get_interpreter, mocker, CFG, LOG):
+        CFG.resolver = "fs"
+        mocker.patch.object(discovery.Builtin, "run", return_value="builtin")
+        assert discovery.AsdfDiscovery(options("3.11")).run() == "builtin"
+        LOG.error.assert_called_once()
+
+
+def test_lazy_plugin_import():
+    code = "import sys, tox_asdf.discovery; assert 'tox_asdf.plugin' not in sys.modules"
+    subprocess.check_call([sys.executable, "-c", code])
@@ -0,0 +1,114 @@
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+
+from tox_asdf import plugin
+from tox_asdf.artifacts import ChecksumMismatch
+from tox_asdf.downloads import DownloadCache, build_packages
+
+DEFINITION = """\
+prefer_openssl3
+install_package "openssl-3.1.2" "https://e.com/openssl.tar.gz#aaa" mac_openssl --if has_broken_mac_openssl
+install_package "sqlite" "https://example.com/sqlite.tar.gz" standard
+install_package "pypy" "https://example.com/pypy${VERSION}.tar.bz2#bbb" pypy
+if has_tar_xz_support; then
+    install_package "Python-3.12.1" "https://example.com/Python-3.12.1.tar.xz#ccc" standard ensurepip
+else
+    install_package "Python-3.12.1" "https://example.com/Python-3.12.1.tgz#ddd" standard ensurepip
+fi
+"""
+
+
+@pytest.fixture(name="package")
+def fake_package(tmp_path):
+    path = tmp_path / "Python-3.12.1.tar.xz"
+    path.write_bytes(b"python sources")
+    return path.as_uri(), hashlib.sha256(b"python sources").hexdigest()
+
+
+def test_build_packages(tmp_path):
+    definition = tmp_path / "3.12.1"
+    definition.write_text(DEFINITION)
+    assert build_packages(str(definition)) == [
+        ("Python-3.12.1", "https://example.com/Python-3.12.1.tar.xz", "ccc")
+    ]
+
+
+class TestDownloadCache:
+    def test_fetch(self, tmp_path, package):
+        url, checksum = package
+        cache = DownloadCache(str(tmp_path / "downloads"))
+        assert cache.fetch(url, checksum) is True
+        assert (tmp_path / "downloads" / checksum).read_bytes() == b"python sources"
+        assert cache.fetch(url, checksum) is False
+
+    def test_checksum_mismatch(self, tmp_path, package):
+        url, _ = package
+        cache = DownloadCache(str(tmp_path / "downloads"))
+        with pytest.raises(ChecksumMismatch):
+            cache.fetch(url, "0" * 64)
+        assert list((tmp_path / "downloads").iterdir()) == []
+
+    def test_mirror_url(self, tmp_path):
+        cache = DownloadCache(str(tmp_path / "my downloads"))
+        assert cache.mirror_url() == (tmp_path / "my downloads").as_uri()
+
+
+class TestDownloadEnv:
+    def test_no_cache(self, CFG, tmp_path):
+        CFG.download_cache = str(tmp_path / "missing")
+        assert plugin.download_env() is None
+
+    def test_mirror(self, CFG, tmp_path, monkeypatch):
+        monkeypatch.delenv("PYTHON_BUILD_MIRROR_URL", raising=False)
+        CFG.download_cache = str(tmp_path)
+        env = plugin.download_env({"MAKE_OPTS": "-j2"})
+        assert env == {"MAKE_OPTS": "-j2", "PYTHON_BUILD_MIRROR_URL": tmp_path.as_uri()}
+
+    def test_keep_configured_mirror(self, CFG, tmp_path, monkeypatch):
+        monkeypatch.setenv("PYTHON_BUILD_MIRROR_URL", "https://mirror.example.com")
+        CFG.download_cache = str(tmp_path)
+        assert plugin.download_env() is None
+
+    def test_install_with_mirror(self, asdf, mocker, CFG, tmp_path, monkeypatch):
+        monkeypatch.delenv("PYTHON_BUILD_MIRROR_URL", raising=False)
+        CFG.download_cache = str(tmp_path)
+        run_shell = mocker.spy(plugin, "run_shell")
+        plugin.asdf_install_version("3.6.0")
+        assert run_shell.call_args[1]["env"]["PYTHON_BUILD_MIRROR_URL"] == tmp_path.as_uri()
+
+
+class TestFetch:
+    @pytest.fixture(name="definitions")
+    def fake_definitions(self, monkeypatch, tmp_path, package, mocker):
+        monkeypatch.setenv("PYENV_ROOT", str(tmp_path / "pyenv"))
+        definitions = tmp_path / "pyenv" / "plugins" / "python-build" / "share" / "python-build"
+        definitions.mkdir(parents=True)
+        url, checksum = package
+        definition = 'install_package "Python-3.12.1" "{}#{}" standard\n'
+        (definitions / "3.12.1").write_text(definition.format(url, checksum))
+        mocker.patch.object(plugin, "run_shell", return_value="3.11.7\n3.12.1\n")
+        return definitions
+
+    def envconfigs(self, *basepythons):
+        return [SimpleNamespace(basepython=basepython) for basepython in basepythons]
+
+    def test_fetch(self, definitions, package, CFG, tmp_path):
+        CFG.backend = "pyenv"
+        CFG.download_cache = str(tmp_path / "downloads")
+        plugin.fetch_downloads(self.envconfigs("python3.12", "python3.12", "lint"))
+        assert (tmp_path / "downloads" / package[1]).exists()
+
+    def test_missing_definition(self, definitions, CFG, tmp_path, LOG):
+        CFG.backend = "pyenv"
+        CFG.download_cache = str(tmp_path / "downloads")
+        plugin.fetch_downloads(self.envconfigs("python3.11", "python3.13"))
+        assert LOG.warning.call_count == 2
+        assert not (tmp_path / "downloads").exists()
+
+    def test_no_build(self, CFG, tmp_path, LOG):
+        CFG.backend = "directory"
+        CFG.pythons_dir = str(tmp_path)
+        plugin.fetch_downloads(self.envconfigs("python3.12"))
+        LOG.warning.assert_called_once()
@@ -0,0 +1,188 @@
+import importlib.util
+import os
+import py_compile
+import time
+
+import pytest
+
+from tox_asdf import footprint, plugin
+from tox_asdf.cache import UsageCache
+from tox_asdf.lockfile import LockFile
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [("1024", 1024), ("512M", 512 * 1024**2), ("1.5G", 3 * 1024**3 // 2), ("2GiB", 2 * 1024**3)],
+)
+def test_parse_size(value, expected):
+    assert footprint.parse_size(value) == expected
+
+
+def test_parse_invalid_size():
+    with pytest.raises(ValueError):
+        footprint.parse_size("big")
+
+
+def test_disk_usage_share_hardlinks(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a" / "file").write_bytes(b"x" * 100000)
+    alone = footprint.disk_usage(str(tmp_path / "a"))
+    os.link(str(tmp_path / "a" / "file"), str(tmp_path / "b" / "file"))
+    assert footprint.disk_usage(str(tmp_path / "a")) == alone // 2
+    assert footprint.disk_usage(str(tmp_path / "b")) == alone // 2
+
+
+def test_tool_versions_pins(tmp_path):
+    project = tmp_path / "project" / "sub"
+    project.mkdir(parents=True)
+    (tmp_path / "project" / ".tool-versions").write_text(
+        "nodejs 20.1.0\npython 3.12.1 3.11.4 system  # comment\n"
+    )
+    (project / ".tool-versions").write_text("python ref:v3.13.0 3.13.0\n")
+    home = tmp_path / "home"
+    home.mkdir()
+    (home / ".tool-versions").write_text("python 3.10.2\n")
+    pins = footprint.tool_versions_pins(str(project), home=str(home))
+    assert pins == {"3.12.1", "3.11.4", "3.13.0", "3.10.2"}
+
+
+class TestSelectEvictions:
+    LAST_USED = {"3.6.0": 30, "3.7.0": 10, "3.8.0": None, "3.9.0": 20}
+
+    def test_max_versions(self):
+        evictions = footprint.select_evictions(self.LAST_USED, {}, max_versions=2)
+        assert evictions == ["3.8.0", "3.7.0"]
+
+    def test_max_size(self):
+        sizes = dict.fromkeys(self.LAST_USED, 100)
+        evictions = footprint.select_evictions(self.LAST_USED, sizes, max_size=250)
+        assert evictions == ["3.8.0", "3.7.0"]
+
+    def test_protected(self):
+        evictions = footprint.select_evictions(
+            self.LAST_USED, {}, protected={"3.8.0"}, max_versions=2
+        )
+        assert evictions == ["3.7.0", "3.9.0"]
+
+    def test_no_quota(self):
+        assert footprint.select_evictions(self.LAST_USED, {}) == []
+
+
+class TestDedupe:
+    def make(self, installs, version, content):
+        lib = installs / version / "lib" / "python3.12"
+        (lib / "site-packages").mkdir(parents=True)
+        (lib / "os.py").write_text(content)
+        (lib / "site-packages" / "pip.py").write_text("pip")
+        # Sources unpacked from the same archive
+        os.utime(str(lib / "os.py"), ns=(0, 0))
+        return lib
+
+    def test_hardlink_identical_files(self, tmp_path):
+        first = self.make(tmp_path, "3.12.0", "same")
+        second = self.make(tmp_path, "3.12.1", "same")
+        saved = footprint.dedupe([str(tmp_path / "3.12.0"), str(tmp_path / "3.12.1")])
+        assert saved == 4
+        assert os.path.samefile(str(first / "os.py"), str(second / "os.py"))
+        assert not os.path.samefile(
+            str(first / "site-packages" / "pip.py"), str(second / "site-packages" / "pip.py")
+        )
+        assert os.listdir(str(second)) == os.listdir(str(first))
+
+    def test_keep_different_files(self, tmp_path):
+        first = self.make(tmp_path, "3.12.0", "same")
+        second = self.make(tmp_path, "3.12.1", "diff")
+        assert footprint.dedupe([str(tmp_path / "3.12.0"), str(tmp_path / "3.12.1")]) == 0
+        assert not os.path.samefile(str(first / "os.py"), str(second / "os.py"))
+
+    def test_keep_sources_bytecode_valid(self, tmp_path):
+        first = self.make(tmp_path, "3.12.0", "same")
+        second = self.make(tmp_path, "3.12.1", "same")
+        os.utime(str(second / "os.py"), ns=(10**18, 10**18))
+        for lib in (first, second):
+            py_compile.compile(str(lib / "os.py"), doraise=True)
+        pyc = importlib.util.cache_from_source(str(second / "os.py"))
+        with open(pyc, "rb") as f:
+            recorded_mtime = int.from_bytes(f.read(12)[8:12], "little")
+
+        footprint.dedupe([str(tmp_path / "3.12.0"), str(tmp_path / "3.12.1")])
+
+        assert not os.path.samefile(str(first / "os.py"), str(second / "os.py"))
+        assert int(os.stat(str(second / "os.py")).st_mtime) & 0xFFFFFFFF == recorded_mtime
+
+
+class TestUsage:
+    @pytest.mark.pythons("3.6.0", "3.7.0")
+    def test_record_usage(self, installs, CFG):
+        python = plugin.get_python_executable("python3.6")
+        plugin.record_usage(python)
+        last_used = UsageCache(plugin.default_cache_dir()).last_used(str(installs))
+        assert list(last_used) == ["3.6.0"]
+        assert last_used["3.6.0"] == pytest.approx(time.time(), abs=60)
+
+    def test_ignore_other_pythons(self, installs):
+        plugin.record_usage("/usr/bin/python")
+        assert UsageCache(plugin.default_cache_dir()).last_used(str(installs)) == {}
+
+
+def installed(installs):
+    return sorted(name for name in os.listdir(str(installs)) if not name.startswith("."))
+
+
+class TestCollectGarbage:
+    @pytest.fixture(autouse=True)
+    def setup(self, asdf, installs, CFG, tmp_path):
+        asdf.installs = str(installs.parent)
+        CFG.project_dir = str(tmp_path)
+        CFG.lock_file = str(tmp_path / "tox-asdf.lock")
+
+    def use(self, installs, *versions):
+        usage = UsageCache(plugin.default_cache_dir())
+        for version in versions:
+            usage.touch(str(installs), version)
+
+    @pytest.mark.pythons("3.6.0", "3.7.0", "3.8.0", "3.9.0")
+    def test_evict_least_recently_used(self, installs, CFG):
+        CFG.gc_max_versions = 2
+        self.use(installs, "3.9.0", "3.6.0", "3.8.0")
+        plugin.collect_garbage()
+        assert installed(installs) == ["3.6.0", "3.8.0"]
+        assert set(UsageCache(plugin.default_cache_dir()).last_used(str(installs))) == {
+            "3.6.0",
+            "3.8.0",
+        }
+
+    @pytest.mark.pythons("3.6.0", "3.7.0", "3.8.0")
+    def test_never_evict_pinned(self, installs, CFG, tmp_path):
+        CFG.gc_max_versions = 1
+        (tmp_path / ".tool-versions").write_text("python 3.6.0\n")
+        lock = LockFile(CFG.lock_file)
+        lock.set("python3.7", "3.7.0", str(installs / "3.7.0" / "bin" / "python"))
+        lock.write()
+        plugin.collect_garbage()
+        assert installed(installs) == ["3.6.0", "3.7.0"]
+
+    @pytest.mark.pythons("3.6.0", "3.7.0")
+    def test_never_evict_used_in_run(self, installs, CFG):
+        CFG.gc_max_versions = 0
+        plugin.record_usage(str(installs / "3.6.0" / "bin" / "python"))
+        plugin.collect_garbage()
+        assert installed(installs) == ["3.6.0"]
+
+    @pytest.mark.pythons("3.6.0", "3.7.0")
+    def test_no_quota(self, installs):
+        plugin.collect_garbage()
+        assert installed(installs) == ["3.6.0", "3.7.0"]
+
+    @pytest.mark.pythons("3.12.0", "3.12.1")
+    def test_dedupe(self, installs, CFG):
+        CFG.gc_dedupe = True
+        for version in ("3.12.0", "3.12.1"):
+            (installs / version / "lib").mkdir()
+            (installs / version / "lib" / "os.py").write_text("same")
+            os.utime(str(installs / version / "lib" / "os.py"), ns=(0, 0))
+        plugin.collect_garbage()
+        assert os.path.samefile(
+            str(installs / "3.12.0" / "lib" / "os.py"), str(installs / "3.12.1" / "lib" / "os.py")
+        )
@@ -0,0 +1,108 @@
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from tox_asdf import plugin
+
+
+@pytest.fixture(name="python")
+def real_python(tmp_path):
+    """A real interpreter as if installed by asdf"""
+    python = tmp_path / "installs" / "python" / "3.x" / "bin" / "python"
+    python.parent.mkdir(parents=True)
+    python.symlink_to(sys.executable)
+    return str(python)
+
+
+class TestInspectPython:
+    def test_inspect(self, python):
+        info = plugin.inspect_python(python)
+        assert info["version_info"][:3] == list(sys.version_info[:3])
+        assert info["implementation"] == "CPython"
+        assert info["paths"]["stdlib"]
+        assert set(info["build"]) == {"config_args", "py_debug", "py_gil_disabled"}
+
+    def test_timed(self, python):
+        plugin.inspect_python(python)
+        plugin.inspect_python(python)
+        commands = plugin.RUN.timings.commands
+        assert [(event["argv"], event["returncode"]) for event in commands] == [(python, 0)]
+
+    def test_memoized(self, python, mocker):
+        info = plugin.inspect_python(python)
+        check_output = mocker.spy(plugin.subprocess, "check_output")
+        assert plugin.inspect_python(python) is info
+        check_output.assert_not_called()
+
+    def test_cached_across_runs(self, python, mocker):
+        info = plugin.inspect_python(python)
+        plugin.RUN = plugin.RunState()
+        check_output = mocker.spy(plugin.subprocess, "check_output")
+        assert plugin.inspect_python(python) == info
+        check_output.assert_not_called()
+
+    def test_not_runnable(self, tmp_path):
+        python = tmp_path / "python"
+        python.write_text("#!/bin/sh\nexit 1\n")
+        python.chmod(0o755)
+        with pytest.raises(plugin.AsdfError):
+            plugin.inspect_python(str(python))
+        assert plugin.RUN.timings.commands[0]["returncode"] == 1
+
+    def test_missing(self, tmp_path):
+        with pytest.raises(plugin.AsdfError):
+            plugin.inspect_python(str(tmp_path / "python"))
+
+    def test_unexpected_output(self, tmp_path):
+        python = tmp_path / "python"
+        python.write_text("#!/bin/sh\necho garbage\n")
+        python.chmod(0o755)
+        with pytest.raises(plugin.AsdfError):
+            plugin.inspect_python(str(python))
+
+
+class TestShareInterpreterInfo:
+    def envconfig(self):
+        interpreters = SimpleNamespace(executable2info={})
+        return SimpleNamespace(
+            basepython="python3.6", config=SimpleNamespace(interpreters=interpreters)
+        )
+
+    def test_share_with_tox(self, python):
+        envconfig = self.envconfig()
+        info = plugin.inspect_python(python)
+        plugin.share_interpreter_info(envconfig, python)
+        tox_info = envconfig.config.interpreters.executable2info[python]
+        assert tox_info.executable == python
+        assert tox_info.version_info == tuple(info["version_info"])
+        assert tox_info.implementation == info["implementation"]
+
+    def test_unknown_python(self, python):
+        envconfig = self.envconfig()
+        plugin.share_interpreter_info(envconfig, python)
+        assert envconfig.config.interpreters.executable2info == {}
+
+    def test_from_hook(self, python, mocker):
+        mocker.patch.object(plugin, "get_python_executable", return_value=python)
+        plugin.inspect_python(python)
+        envconfig = self.envconfig()
+        assert plugin.tox_get_python_executable(envconfig) == python
+        assert python in envconfig.config.interpreters.executable2info
+
+
+class TestBrokenInstall:
+    @pytest.mark.pythons("3.6.0")
+    def test_fallback(self, installs, LOG):
+        (installs / "3.6.0" / "bin" / "python").write_text("#!/bin/sh\nexit 1\n")
+        envconfig = SimpleNamespace(basepython="python3.6")
+        assert plugin.tox_get_python_executable(envconfig) is None
+        LOG.error.assert_called_once()
+
+    @pytest.mark.pythons("3.6.0")
+    def test_no_fallback(self, installs, CFG, LOG):
+        CFG.no_fallback = True
+        (installs / "3.6.0" / "bin" / "python").write_text("#!/bin/sh\nexit 1\n")
+        envconfig = SimpleNamespace(basepython="python3.6")
+        with pytest.raises(plugin.AsdfError):
+            plugin.tox_get_python_executable(envconfig)
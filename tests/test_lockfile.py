@@ -0,0 +1,130 @@
+import json
+
+import pytest
+
+from tox_asdf import plugin
+from tox_asdf.lockfile import LockFile
+
+
+@pytest.fixture(name="lock_file")
+def lock_file_path(tmp_path, CFG):
+    path = tmp_path / "project" / "tox-asdf.lock"
+    CFG.lock_file = str(path)
+    return path
+
+
+def write_lock(CFG, *basepythons):
+    CFG.lock = True
+    plugin.write_lock_file(basepythons)
+    CFG.lock = False
+    plugin.RUN = plugin.RunState()
+
+
+class TestLockFile:
+    def test_roundtrip(self, installs, tmp_path):
+        python = str(installs / "3.6.0" / "bin" / "python")
+        lock = LockFile(str(tmp_path / "tox-asdf.lock"))
+        lock.set("python3.6", "3.6.0", python)
+        lock.write()
+        entry = LockFile(str(tmp_path / "tox-asdf.lock")).get("python3.6")
+        assert entry["version"] == "3.6.0"
+        assert entry["python"] == python
+        assert lock.is_valid(entry)
+
+    @pytest.mark.pythons("3.6.0")
+    def test_stale(self, installs, tmp_path):
+        python = installs / "3.6.0" / "bin" / "python"
+        lock = LockFile(str(tmp_path / "tox-asdf.lock"))
+        lock.set("python3.6", "3.6.0", str(python))
+        python.write_text("changed")
+        assert not lock.is_valid(lock.get("python3.6"))
+
+
+class TestWriteLockFile:
+    @pytest.mark.pythons("3.6.0", "3.7.1", "pypy3.8-7.3.0")
+    def test_write(self, installs, lock_file, CFG):
+        write_lock(CFG, "python3.6", "python3.7", "python3.6", "pypy3", "*TEST*")
+        data = json.loads(lock_file.read_text())
+        assert sorted(data["pythons"]) == ["pypy3", "python3.6", "python3.7"]
+        entry = data["pythons"]["python3.7"]
+        assert entry["version"] == "3.7.1"
+        assert entry["python"] == str(installs / "3.7.1" / "bin" / "python")
+        assert entry["info"]["implementation"] == "CPython"
+
+    @pytest.mark.pythons("3.6.0")
+    def test_skip_missing(self, installs, lock_file, CFG):
+        write_lock(CFG, "python3.6", "python3.7")
+        assert list(json.loads(lock_file.read_text())["pythons"]) == ["python3.6"]
+
+    @pytest.mark.pythons("3.6.0")
+    def test_write_error(self, installs, tmp_path, CFG, LOG):
+        (tmp_path / "project").write_text("")
+        CFG.lock_file = str(tmp_path / "project" / "tox-asdf.lock")
+        write_lock(CFG, "python3.6")
+        LOG.error.assert_called_once()
+
+
+class TestResolveFromLockFile:
+    @pytest.fixture(name="popen")
+    def spy_popen(self, mocker):
+        return mocker.spy(plugin.subprocess, "Popen")
+
+    @pytest.mark.pythons("3.6.0")
+    def test_locked(self, installs, lock_file, CFG, popen, mocker):
+        write_lock(CFG, "python3.6")
+        resolve = mocker.spy(plugin, "resolve_python")
+        python = plugin.get_python_executable("python3.6")
+        assert python == str(installs / "3.6.0" / "bin" / "python")
+        assert python in plugin.RUN.metadata
+        resolve.assert_not_called()
+        assert popen.call_count == 1  # Only the lock writing inspection
+
+    @pytest.mark.pythons("3.6.0", "3.6.1")
+    def test_pinned_over_newer_install(self, installs, lock_file, CFG):
+        (installs / "3.6.1").rename(installs / "3.6.1-tmp")
+        write_lock(CFG, "python3.6")
+        (installs / "3.6.1-tmp").rename(installs / "3.6.1")
+        python = plugin.get_python_executable("python3.6")
+        assert python == str(installs / "3.6.0" / "bin" / "python")
+
+    @pytest.mark.pythons("3.6.0")
+    def test_stale(self, installs, lock_file, CFG, LOG):
+        write_lock(CFG, "python3.6")
+        (installs / "3.6.0" / "bin" / "python").write_text("changed")
+        plugin.get_python_executable("python3.6")
+        LOG.warning.assert_called_once()
+
+    @pytest.mark.pythons("3.6.0")
+    def test_not_locked(self, installs, lock_file, CFG, LOG):
+        write_lock(CFG, "python3.6")
+        assert plugin.get_python_executable("python3.7") is None
+        LOG.warning.assert_not_called()
+
+    @pytest.mark.pythons("3.6.0")
+    def test_strict_stale(self, installs, lock_file, CFG):
+        write_lock(CFG, "python3.6")
+        (installs / "3.6.0" / "bin" / "python").write_text("changed")
+        CFG.lock_strict = True
+        with pytest.raises(plugin.AsdfError):
+            plugin.get_python_executable("python3.6")
+
+    @pytest.mark.pythons("3.6.0")
+    def test_strict_not_locked(self, installs, lock_file, CFG):
+        write_lock(CFG, "python3.6")
+        CFG.lock_strict = True
+        with pytest.raises(plugin.AsdfError):
+            plugin.get_python_executable("python3.7")
+
+    def test_strict_missing_lock_file(self, lock_file, CFG):
+        CFG.lock_strict = True
+        with pytest.raises(plugin.AsdfError):
+            plugin.get_python_executable("python3.6")
+
+    @pytest.mark.pythons("3.6.0")
+    def test_ignored_when_locking(self, installs, lock_file, CFG, mocker):
+        write_lock(CFG, "python3.6")
+        CFG.lock = True
+        CFG.cache = False
+        resolve = mocker.spy(plugin, "resolve_python")
+        plugin.get_python_executable("python3.6")
+        resolve.assert_called_once()
@@ -1,3 +1,4 @@
+import pytest
 import tox.session
 
 
@@ -6,6 +7,12 @@ def init(args):
     return tox.session.build_session(config)
 
 
+@pytest.fixture(autouse=True)
+def prefetch_pythons(mocker):
+    """Never resolve this repository environments"""
+    return mocker.patch("tox_asdf.plugin.prefetch_pythons")
+
+
 class TestToxOptions:
     def test_default_options(self, CFG):
         init([])
@@ -13,6 +20,14 @@ class TestToxOptions:
         assert CFG.debug is False
         assert CFG.install is False
         assert CFG.no_fallback is False
+        assert CFG.resolver == "auto"
+        assert CFG.cache is True
+        assert CFG.install_jobs == 0
+        assert CFG.offline is False
+        assert CFG.lock is False
+        assert CFG.backend == "auto"
+        assert CFG.timeout == 120
+        assert CFG.lock_file.endswith("tox-asdf.lock")
 
     def test_asdf_no_fallback(self, CFG):
         init(["--asdf-no-fallback"])
@@ -21,12 +36,21 @@ class TestToxOptions:
         assert CFG.install is False
         assert CFG.no_fallback is True
 
-    def test_asdf_install(self, CFG):
+    def test_asdf_install(self, CFG, mocker):
+        schedule_installs = mocker.patch("tox_asdf.plugin.schedule_installs")
         init(["--asdf-install"])
         assert CFG.verbose is False
         assert CFG.debug is False
         assert CFG.install is True
         assert CFG.no_fallback is False
+        schedule_installs.assert_called_once()
+
+    @pytest.mark.parametrize("option", ["-l", "-a", "--showconfig"])
+    def test_no_install_when_listing(self, CFG, mocker, option):
+        schedule_installs = mocker.patch("tox_asdf.plugin.schedule_installs")
+        init(["--asdf-install", option])
+        assert CFG.install is True
+        schedule_installs.assert_not_called()
 
     def test_verbose(self, CFG):
         init(["-v"])
@@ -41,3 +65,68 @@ class TestToxOptions:
         assert CFG.debug is True
         assert CFG.install is False
         assert CFG.no_fallback is False
+
+    def test_asdf_resolver(self, CFG):
+        init(["--asdf-resolver", "fs"])
+        assert CFG.resolver == "fs"
+
+    def test_asdf_no_cache(self, CFG):
+        init(["--asdf-no-cache"])
+        assert CFG.cache is False
+
+    def test_asdf_install_jobs(self, CFG):
+        init(["--asdf-install-jobs", "2"])
+        assert CFG.install_jobs == 2
+
+    def test_asdf_offline(self, CFG):
+        init(["--asdf-offline"])
+        assert CFG.offline is True
+
+    def test_asdf_timings(self, CFG):
+        init(["--asdf-timings", "--asdf-timings-json", "timings.json"])
+        assert CFG.timings is True
+        assert CFG.timings_json == "timings.json"
+
+    def test_asdf_venv_templates(self, CFG):
+        init(["--asdf-venv-templates"])
+        assert CFG.venv_templates is True
+
+    def test_asdf_artifacts(self, CFG):
+        init(["--asdf-artifacts", "/artifacts"])
+        assert CFG.artifacts == "/artifacts"
+
+    def test_asdf_lock_strict(self, CFG):
+        init(["--asdf-lock-strict"])
+        assert CFG.lock_strict is True
+
+    def test_asdf_lock(self, CFG, mocker):
+        write_lock_file = mocker.patch("tox_asdf.plugin.write_lock_file")
+        init(["--asdf-lock"])
+        assert CFG.lock is True
+        write_lock_file.assert_called_once()
+
+    def test_asdf_fetch(self, CFG, mocker):
+        fetch_downloads = mocker.patch("tox_asdf.plugin.fetch_downloads")
+        init(["--asdf-fetch"])
+        assert CFG.fetch is True
+        fetch_downloads.assert_called_once()
+
+    def test_asdf_timeout(self, CFG):
+        init(["--asdf-timeout", "5"])
+        assert CFG.timeout == 5
+
+
+class TestPrefetch:
+    def test_prefetch_envlist(self, prefetch_pythons):
+        init([])
+        envconfigs = list(prefetch_pythons.call_args[0][0])
+        assert [envconfig.envname for envconfig in envconfigs][-1] == "lint"
+
+    def test_prefetch_selected_envs(self, prefetch_pythons):
+        init(["-e", "py38,py39"])
+        envconfigs = prefetch_pythons.call_args[0][0]
+        assert [envconfig.envname for envconfig in envconfigs] == ["py38", "py39"]
+
+    def test_no_prefetch_when_listing(self, prefetch_pythons):
+        init(["-l"])
+        prefetch_pythons.assert_not_called()
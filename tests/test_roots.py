@@ -0,0 +1,109 @@
+import os
+import shutil
+from types import SimpleNamespace
+
+import pytest
+from conftest import fake_pythons
+
+from tox_asdf import plugin
+
+
+@pytest.fixture(name="local")
+def local_installs(monkeypatch, tmp_path):
+    monkeypatch.setenv("ASDF_DATA_DIR", str(tmp_path / "asdf"))
+    return fake_pythons(tmp_path / "asdf" / "installs" / "python", "3.12.0", "3.11.7")
+
+
+@pytest.fixture(name="remote")
+def remote_installs(tmp_path, CFG):
+    remote = fake_pythons(tmp_path / "nfs", "3.12.1", "3.11.7", "3.10.13")
+    CFG.roots = [str(remote)]
+    return remote
+
+
+def python(root, version):
+    return str(root / version / "bin" / "python")
+
+
+class TestRoots:
+    def test_merged_index(self, local, remote):
+        assert plugin.get_python_executable("python3.12") == python(remote, "3.12.1")
+        assert plugin.get_python_executable("python3.10") == python(remote, "3.10.13")
+
+    def test_local_first(self, local, remote):
+        assert plugin.get_python_executable("python3.11") == python(local, "3.11.7")
+
+    def test_ordered_roots(self, local, remote, CFG):
+        CFG.roots = [str(remote), str(local)]
+        assert plugin.get_python_executable("python3.11") == python(remote, "3.11.7")
+
+    def test_missing_root(self, local, remote, CFG, tmp_path):
+        CFG.roots = [str(tmp_path / "unmounted"), str(remote)]
+        assert plugin.get_python_executable("python3.10") == python(remote, "3.10.13")
+
+    def test_missing_local(self, remote, monkeypatch, tmp_path):
+        monkeypatch.setenv("ASDF_DATA_DIR", str(tmp_path / "fresh"))
+        assert plugin.get_python_executable("python3.12") == python(remote, "3.12.1")
+
+    def test_cache_invalidated_by_roots(self, local, remote):
+        plugin.get_python_executable("python3.12")
+        fake_pythons(remote, "3.12.2")
+        plugin.RUN = plugin.RunState()
+        assert plugin.get_python_executable("python3.12") == python(remote, "3.12.2")
+
+    def test_parse_config(self):
+        config = plugin.Config()
+        roots = "\n/mnt/pythons\n~/pythons"
+        plugin.parse_config_options({"asdf": {"roots": roots, "copy_on_demand": "true"}}, config)
+        assert config.roots == ["/mnt/pythons", os.path.expanduser("~/pythons")]
+        assert config.copy_on_demand is True
+
+
+class TestCopyOnDemand:
+    @pytest.fixture(autouse=True)
+    def copy_on_demand(self, CFG):
+        CFG.copy_on_demand = True
+
+    def test_copy(self, local, remote):
+        assert plugin.get_python_executable("python3.12") == python(local, "3.12.1")
+        assert os.path.exists(python(remote, "3.12.1"))
+        assert sorted(name for name in os.listdir(str(local)) if not name.startswith(".")) == [
+            "3.11.7",
+            "3.12.0",
+            "3.12.1",
+        ]
+
+    def test_copy_once(self, local, remote, mocker):
+        plugin.get_python_executable("python3.12")
+        plugin.RUN = plugin.RunState()
+        copytree = mocker.spy(shutil, "copytree")
+        assert plugin.get_python_executable("python3.12") == python(local, "3.12.1")
+        copytree.assert_not_called()
+
+    def test_copy_to_missing_local(self, remote, monkeypatch, tmp_path):
+        monkeypatch.setenv("ASDF_DATA_DIR", str(tmp_path / "fresh"))
+        local = tmp_path / "fresh" / "installs" / "python"
+        assert plugin.get_python_executable("python3.10") == python(local, "3.10.13")
+
+    def test_copy_error(self, local, remote, mocker, LOG):
+        mocker.patch.object(shutil, "copytree", side_effect=OSError("No space left on device"))
+        assert plugin.get_python_executable("python3.12") == python(remote, "3.12.1")
+        LOG.warning.assert_called_once()
+        assert not (local / "3.12.1").exists()
+        assert not (local / ".3.12.1.tox-asdf-installing").exists()
+
+    def test_variant_copies_picked_version_only(self, local, CFG, tmp_path):
+        builds = {
+            "3.12.2": {"config_args": "--with-pydebug", "py_debug": True},
+            "3.12.0": {"config_args": "--enable-optimizations"},
+        }
+        remote = fake_pythons(tmp_path / "nfs", "3.12.2", "3.12.1", builds=builds)
+        CFG.roots = [str(remote)]
+        shutil.rmtree(str(local / "3.12.0"))
+        fake_pythons(remote, "3.12.0", builds=builds)
+        envconfig = SimpleNamespace(envname="py", basepython="python3.12", asdf_variant="optimized")
+        plugin.parse_envs_variants([envconfig])
+        assert plugin.get_python_executable("python3.12") == python(local, "3.12.0")
+        copied = sorted(name for name in os.listdir(str(local)) if not name.startswith("."))
+        assert copied == ["3.11.7", "3.12.0"]
+        assert not (local / ".3.12.2.tox-asdf.lock").exists()
@@ -0,0 +1,141 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from tox_asdf import plugin, templates
+
+
+def fake_virtualenv(cmd, **kwargs):
+    """Build a minimal virtualenv layout like `virtualenv` would"""
+    path = cmd[-1]
+    os.makedirs(os.path.join(path, "bin"))
+    os.makedirs(os.path.join(path, "lib", "site-packages"))
+    os.symlink("lib", os.path.join(path, "lib64"))
+    os.symlink(cmd[cmd.index("--python") + 1], os.path.join(path, "bin", "python"))
+    with open(os.path.join(path, "bin", "activate"), "w") as f:
+        f.write('VIRTUAL_ENV="{}"\n'.format(path))
+    with open(os.path.join(path, "bin", "pip"), "w") as f:
+        f.write("#!{}/bin/python\n".format(path))
+    os.chmod(os.path.join(path, "bin", "pip"), 0o755)
+    with open(os.path.join(path, "pyvenv.cfg"), "w") as f:
+        f.write("home = /somewhere\n")
+    with open(os.path.join(path, "lib", "site-packages", "module.py"), "w") as f:
+        f.write("VALUE = 42\n")
+    return ""
+
+
+@pytest.fixture(name="check_output")
+def mock_check_output(mocker):
+    return mocker.patch.object(templates.subprocess, "check_output", side_effect=fake_virtualenv)
+
+
+@pytest.fixture(name="template")
+def template_venv(tmp_path, check_output):
+    return templates.ensure_template(str(tmp_path / "templates"), "key", sys.executable)
+
+
+class TestEnsureTemplate:
+    def test_create(self, template, tmp_path, check_output):
+        assert template == str(tmp_path / "templates" / "key")
+        assert os.path.exists(os.path.join(template, templates.MARKER))
+        cmd = check_output.call_args[0][0]
+        assert cmd[:5] == [sys.executable, "-m", "virtualenv", "--python", sys.executable]
+        assert [p for p in os.listdir(str(tmp_path / "templates")) if p.startswith(".")] == []
+
+    def test_reuse(self, template, tmp_path, check_output):
+        assert (
+            templates.ensure_template(str(tmp_path / "templates"), "key", sys.executable)
+            == template
+        )
+        check_output.assert_called_once()
+
+    def test_creation_args(self, tmp_path, check_output):
+        templates.ensure_template(str(tmp_path), "key", sys.executable, ["--no-download"])
+        assert "--no-download" in check_output.call_args[0][0]
+
+    def test_key(self):
+        key = templates.template_key(sys.executable, [1, 2, 3], "--download")
+        assert key == templates.template_key(sys.executable, [1, 2, 3], "--download")
+        assert key != templates.template_key(sys.executable, [1, 2, 4], "--download")
+        assert key != templates.template_key(sys.executable, [1, 2, 3], "--no-download")
+
+
+class TestCloneTemplate:
+    @pytest.fixture(name="clone")
+    def clone_venv(self, template, tmp_path):
+        target = str(tmp_path / "env")
+        templates.clone_template(template, target)
+        return target
+
+    def test_relocate_scripts(self, template, clone):
+        with open(os.path.join(clone, "bin", "activate")) as f:
+            assert f.read() == 'VIRTUAL_ENV="{}"\n'.format(clone)
+        with open(os.path.join(clone, "bin", "pip")) as f:
+            assert f.read() == "#!{}/bin/python\n".format(clone)
+        assert os.access(os.path.join(clone, "bin", "pip"), os.X_OK)
+
+    def test_template_untouched(self, template, clone):
+        with open(os.path.join(template, templates.MARKER)) as f:
+            prefix = json.load(f)["prefix"]
+        with open(os.path.join(template, "bin", "pip")) as f:
+            assert f.read() == "#!{}/bin/python\n".format(prefix)
+
+    def test_hardlink_other_files(self, template, clone):
+        source = os.stat(os.path.join(template, "lib", "site-packages", "module.py"))
+        cloned = os.stat(os.path.join(clone, "lib", "site-packages", "module.py"))
+        assert source.st_ino == cloned.st_ino
+
+    def test_copy_on_link_failure(self, template, tmp_path, mocker):
+        mocker.patch.object(templates.os, "link", side_effect=OSError)
+        target = str(tmp_path / "env")
+        templates.clone_template(template, target)
+        source = os.stat(os.path.join(template, "lib", "site-packages", "module.py"))
+        cloned = os.stat(os.path.join(target, "lib", "site-packages", "module.py"))
+        assert source.st_ino != cloned.st_ino
+
+    def test_symlinks(self, clone):
+        assert os.readlink(os.path.join(clone, "lib64")) == "lib"
+        assert os.readlink(os.path.join(clone, "bin", "python")) == sys.executable
+
+    def test_no_marker(self, clone):
+        assert not os.path.exists(os.path.join(clone, templates.MARKER))
+
+
+class TestToxTestenvCreate:
+    @pytest.fixture(name="venv")
+    def fake_venv(self, tmp_path, mocker, CFG, check_output):
+        CFG.venv_templates = True
+        mocker.patch.object(plugin, "cleanup_for_venv")
+        plugin.RUN.metadata[sys.executable] = {}
+        path = tmp_path / "env"
+        envconfig = SimpleNamespace(
+            envname="py", sitepackages=False, alwayscopy=False, download=False
+        )
+        return SimpleNamespace(
+            envconfig=envconfig, path=path, getsupportedinterpreter=lambda: sys.executable
+        )
+
+    def test_clone(self, venv):
+        assert plugin.tox_testenv_create(venv, None) is True
+        assert (venv.path / "bin" / "pip").exists()
+
+    def test_disabled(self, venv, CFG):
+        CFG.venv_templates = False
+        assert plugin.tox_testenv_create(venv, None) is None
+
+    def test_not_asdf_python(self, venv):
+        plugin.RUN.metadata.clear()
+        assert plugin.tox_testenv_create(venv, None) is None
+
+    @pytest.mark.parametrize("option", ["sitepackages", "alwayscopy"])
+    def test_unsupported_options(self, venv, option):
+        setattr(venv.envconfig, option, True)
+        assert plugin.tox_testenv_create(venv, None) is None
+
+    def test_template_error(self, venv, check_output, LOG):
+        check_output.side_effect = OSError
+        assert plugin.tox_testenv_create(venv, None) is None
+        LOG.warning.assert_called_once()
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from tox_asdf import plugin
+from tox_asdf.timings import Timings
+
+
+class TestTimings:
+    def test_measure(self):
+        timings = Timings()
+        with timings.measure("operation", version="3.6") as details:
+            details["result"] = "3.6.0"
+        (event,) = timings.events
+        assert event["operation"] == "operation"
+        assert event["version"] == "3.6"
+        assert event["result"] == "3.6.0"
+        assert event["duration"] >= 0
+
+    def test_summary(self):
+        timings = Timings()
+        timings.record("a", 1.0)
+        timings.record("a", 3.0)
+        timings.record("b", 2.0)
+        assert timings.summary() == {
+            "a": {"count": 2, "total": 4.0, "max": 3.0},
+            "b": {"count": 1, "total": 2.0, "max": 2.0},
+        }
+
+    def test_format(self):
+        timings = Timings()
+        timings.record("subprocess", 0.5, argv="asdf list python", returncode=0)
+        lines = timings.format()
+        assert lines[0].split() == ["operation", "count", "total", "ms", "max", "ms"]
+        assert lines[1].split() == ["subprocess", "1", "500.0", "500.0"]
+        assert lines[-1].strip() == "[0] 500.0 ms: asdf list python"
+
+    def test_format_empty(self):
+        assert Timings().format() == []
+
+    def test_dump(self, tmp_path):
+        timings = Timings()
+        timings.record("a", 1.0, version="3.6")
+        timings.dump(str(tmp_path / "timings.json"))
+        data = json.loads((tmp_path / "timings.json").read_text())
+        assert data["events"] == [{"operation": "a", "duration": 1.0, "version": "3.6"}]
+        assert data["summary"] == {"a": {"count": 1, "total": 1.0, "max": 1.0}}
+
+
+class TestInstrumentation:
+    @pytest.mark.pythons("3.6.0")
+    def test_record_subprocesses(self, asdf):
+        plugin.asdf_get_installed("3.6")
+        (command,) = plugin.RUN.timings.commands
+        assert command["argv"] == "asdf list python"
+        assert command["returncode"] == 0
+
+    @pytest.mark.asdf_error(42, "Unknown error")
+    def test_record_failing_subprocesses(self, asdf):
+        with pytest.raises(plugin.AsdfError):
+            plugin.asdf_which("3.6.0")
+        (command,) = plugin.RUN.timings.commands
+        assert command["argv"] == "asdf where python 3.6.0"
+        assert command["returncode"] == 42
+
+    @pytest.mark.pythons("3.6.0")
+    def test_record_operations(self, asdf):
+        plugin.asdf_which("3.6.0")
+        summary = plugin.RUN.timings.summary()
+        assert summary["which (cli)"]["count"] == 1
+
+    @pytest.mark.pythons("3.6.0")
+    def test_record_cache_hits_and_misses(self, installs):
+        envconfig = type("EnvConfig", (), {"basepython": "python3.6"})
+        plugin.tox_get_python_executable(envconfig)
+        plugin.tox_get_python_executable(envconfig)
+        plugin.RUN = plugin.RunState()
+        plugin.tox_get_python_executable(envconfig)
+        summary = plugin.RUN.timings.summary()
+        assert summary["disk cache hit"]["count"] == 1
+
+    def test_report(self, CFG, capsys, tmp_path):
+        CFG.timings = True
+        CFG.timings_json = str(tmp_path / "timings.json")
+        timings = Timings()
+        timings.record("subprocess", 0.5, argv="asdf list python", returncode=0)
+        plugin.report_timings(timings)
+        assert "ASDF: subprocess" in capsys.readouterr().out
+        assert (tmp_path / "timings.json").exists()
+
+    def test_no_report(self, CFG, capsys):
+        timings = Timings()
+        timings.record("subprocess", 0.5, argv="asdf list python", returncode=0)
+        plugin.report_timings(timings)
+        assert capsys.readouterr().out == ""
@@ -0,0 +1,144 @@
+import os
+import sys
+import textwrap
+
+import pytest
+import tox.session
+
+from tox_asdf import plugin, tools
+
+
+@pytest.fixture(name="data_dir")
+def fake_tools_installs(monkeypatch, tmp_path):
+    data_dir = tmp_path / "asdf"
+    for tool, version in (("nodejs", "18.19.0"), ("nodejs", "20.11.0"), ("terraform", "1.7.0")):
+        (data_dir / "installs" / tool / version / "bin").mkdir(parents=True)
+    monkeypatch.setenv("ASDF_DATA_DIR", str(data_dir))
+    monkeypatch.delenv("ASDF_NODEJS_VERSION", raising=False)
+    monkeypatch.delenv("ASDF_TERRAFORM_VERSION", raising=False)
+    return data_dir
+
+
+def test_read_tool_versions_closest_wins(tmp_path):
+    project = tmp_path / "project" / "sub"
+    project.mkdir(parents=True)
+    (tmp_path / "home").mkdir()
+    (tmp_path / "home" / ".tool-versions").write_text("nodejs 16\nterraform 1.5.0\n")
+    (tmp_path / "project" / ".tool-versions").write_text("nodejs 18 20  # comment\n")
+    (project / ".tool-versions").write_text("python 3.12.1\n")
+
+    versions = tools.read_tool_versions(str(project), home=str(tmp_path / "home"))
+
+    assert versions == {"nodejs": ["18", "20"], "terraform": ["1.5.0"], "python": ["3.12.1"]}
+
+
+def test_parse_tools():
+    value = "\nnodejs 20\nterraform  # latest installed\n\n"
+    assert tools.parse_tools(value) == {"nodejs": "20", "terraform": None}
+
+
+@pytest.mark.parametrize(
+    "tool,expected", [("nodejs", "ASDF_NODEJS_VERSION"), ("golang-ci", "ASDF_GOLANG_CI_VERSION")]
+)
+def test_version_env_var(tool, expected):
+    assert tools.version_env_var(tool) == expected
+
+
+class TestResolveTool:
+    def test_configured_version(self, data_dir):
+        version, paths = plugin.resolve_tool("nodejs", "18")
+        assert version == "18.19.0"
+        assert paths == [str(data_dir / "installs" / "nodejs" / "18.19.0" / "bin")]
+
+    def test_env_var_version(self, data_dir, monkeypatch):
+        monkeypatch.setenv("ASDF_NODEJS_VERSION", "18")
+        assert plugin.resolve_tool("nodejs")[0] == "18.19.0"
+
+    def test_tool_versions_version(self, data_dir, CFG, tmp_path):
+        CFG.project_dir = str(tmp_path)
+        (tmp_path / ".tool-versions").write_text("nodejs 20.11.0\n")
+        assert plugin.resolve_tool("nodejs")[0] == "20.11.0"
+
+    def test_no_version(self, data_dir, CFG, tmp_path):
+        CFG.project_dir = str(tmp_path)
+        assert plugin.resolve_tool("nodejs") is None
+
+    def test_system(self, data_dir):
+        assert plugin.resolve_tool("nodejs", "system") is None
+
+    def test_not_installed(self, data_dir):
+        with pytest.raises(plugin.AsdfError):
+            plugin.resolve_tool("nodejs", "21")
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="The plugin script is a shell script")
+    def test_plugin_bin_paths(self, data_dir):
+        script = data_dir / "plugins" / "nodejs" / "bin" / "list-bin-paths"
+        script.parent.mkdir(parents=True)
+        script.write_text('#!/bin/sh\necho "bin .npm/bin missing-$ASDF_INSTALL_VERSION"\n')
+        script.chmod(0o755)
+        home = data_dir / "installs" / "nodejs" / "20.11.0"
+        (home / ".npm" / "bin").mkdir(parents=True)
+
+        _, paths = plugin.resolve_tool("nodejs", "20")
+
+        assert paths == [str(home / "bin"), str(home / ".npm" / "bin")]
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="The plugin script is a shell script")
+    def test_plugin_bin_paths_error(self, data_dir):
+        script = data_dir / "plugins" / "nodejs" / "bin" / "list-bin-paths"
+        script.parent.mkdir(parents=True)
+        script.write_text("#!/bin/sh\nmissing-command\n")
+        script.chmod(0o755)
+
+        with pytest.raises(plugin.AsdfError, match="nodejs list-bin-paths failed with code 127"):
+            plugin.resolve_tool("nodejs", "20")
+
+        assert plugin.RUN.broken is None
+
+
+class TestInjectTools:
+    def load(self, tmp_path, tools):
+        ini = tmp_path / "tox.ini"
+        ini.write_text(textwrap.dedent("""\
+                [tox]
+                envlist = py
+                skipsdist = true
+
+                [asdf]
+                tools = {}
+
+                [testenv]
+                setenv =
+                    FOO = bar
+                """).format(tools))
+        return tox.session.load_config(["-c", str(ini)]).envconfigs["py"]
+
+    def test_inject_paths_and_versions(self, data_dir, tmp_path, mocker):
+        mocker.patch.object(plugin, "prefetch_pythons")
+        envconfig = self.load(tmp_path, "\n    nodejs 20\n    terraform 1")
+
+        paths = envconfig.setenv["PATH"].split(os.pathsep)
+
+        assert paths[:2] == [
+            str(data_dir / "installs" / "nodejs" / "20.11.0" / "bin"),
+            str(data_dir / "installs" / "terraform" / "1.7.0" / "bin"),
+        ]
+        assert paths[2:] == os.environ["PATH"].split(os.pathsep)
+        assert envconfig.setenv["ASDF_NODEJS_VERSION"] == "20.11.0"
+        assert envconfig.setenv["ASDF_TERRAFORM_VERSION"] == "1.7.0"
+        assert envconfig.setenv["FOO"] == "bar"
+
+    def test_missing_tool_falls_back_on_shims(self, data_dir, tmp_path, mocker, LOG):
+        mocker.patch.object(plugin, "prefetch_pythons")
+        envconfig = self.load(tmp_path, "golang 1.22")
+
+        assert envconfig.setenv["PATH"] == os.environ["PATH"]
+        assert "ASDF_GOLANG_VERSION" not in envconfig.setenv
+        LOG.warning.assert_called_once()
+
+    def test_resolve_once(self, data_dir, CFG, mocker):
+        spy = mocker.spy(plugin, "resolve_tool")
+        CFG.tools = {"nodejs": "20"}
+        plugin.resolve_tools()
+        plugin.resolve_tools()
+        assert spy.call_count == 1
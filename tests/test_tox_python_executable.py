@@ -1,3 +1,5 @@
+import subprocess
+
 import pytest
 
 from tox_asdf import plugin
@@ -78,6 +80,179 @@ class TestToxGetPythonExecutable:
         python = plugin.tox_get_python_executable(envconfig)
         assert python == asdf.python_bin("pypy3.8-7.0.0")
 
+    @pytest.mark.pythons("2.7.15", "3.6.0", "pypy2.7-6.0.0", "pypy3.8-7.0.0")
+    def test_fs_resolver(self, installs, mocker):
+        popen = mocker.patch("subprocess.Popen", side_effect=subprocess.Popen)
+        python = plugin.tox_get_python_executable(EnvConfig())
+        assert python == str(installs / "3.6.0" / "bin" / "python")
+        assert [c[0][0] for c in popen.call_args_list] == [[python, "-c", plugin.INSPECT_SCRIPT]]
+
+    @pytest.mark.pythons("2.7.15")
+    def test_fs_resolver_fallback_on_cli_for_install(self, installs, asdf, CFG):
+        CFG.install = True
+        asdf.all_pythons = {"3.6.0"}
+        asdf.installs = str(installs.parent)
+        (installs / "3.6.0" / "bin").mkdir(parents=True)
+        (installs / "3.6.0" / "bin" / "python").write_text("")
+        (installs / "3.6.0" / "bin" / "python").chmod(0o755)
+        python = plugin.tox_get_python_executable(EnvConfig())
+        assert python == str(installs / "3.6.0" / "bin" / "python")
+
+    @pytest.mark.pythons("3.6.0")
+    def test_warm_run_use_cache(self, installs, mocker):
+        python = plugin.tox_get_python_executable(EnvConfig())
+        plugin.RUN = plugin.RunState()
+        resolve = mocker.spy(plugin, "resolve_python")
+        assert plugin.tox_get_python_executable(EnvConfig()) == python
+        resolve.assert_not_called()
+
+    @pytest.mark.pythons("3.6.0")
+    def test_no_cache(self, installs, mocker, CFG):
+        CFG.cache = False
+        python = plugin.tox_get_python_executable(EnvConfig())
+        plugin.RUN = plugin.RunState()
+        resolve = mocker.spy(plugin, "resolve_python")
+        assert plugin.tox_get_python_executable(EnvConfig()) == python
+        resolve.assert_called_once_with("3.6")
+
+
+class TestRunMemoization:
+    @pytest.fixture(autouse=True)
+    def no_disk_cache(self, CFG):
+        CFG.cache = False
+
+    @pytest.mark.pythons("3.6.0", "3.7.0")
+    def test_list_installed_once(self, popen):
+        plugin.tox_get_python_executable(EnvConfig("python3.6"))
+        plugin.tox_get_python_executable(EnvConfig("python3.7"))
+        listings = [c for c in popen.call_args_list if c[0][0] == "asdf list python"]
+        assert len(listings) == 1
+
+    @pytest.mark.pythons("3.6.0")
+    def test_memoize_positive(self, popen):
+        python = plugin.tox_get_python_executable(EnvConfig())
+        calls = popen.call_count
+        assert plugin.tox_get_python_executable(EnvConfig()) == python
+        assert popen.call_count == calls
+
+    @pytest.mark.pythons("3.7.0")
+    def test_memoize_negative(self, popen):
+        assert plugin.tox_get_python_executable(EnvConfig()) is None
+        calls = popen.call_count
+        assert plugin.tox_get_python_executable(EnvConfig()) is None
+        assert popen.call_count == calls
+
+    @pytest.mark.pythons("3.7.0")
+    def test_memoize_negative_no_fallback(self, popen, CFG):
+        CFG.no_fallback = True
+        with pytest.raises(plugin.AsdfError):
+            plugin.tox_get_python_executable(EnvConfig())
+        calls = popen.call_count
+        with pytest.raises(plugin.AsdfError):
+            plugin.tox_get_python_executable(EnvConfig())
+        assert popen.call_count == calls
+
+    @pytest.mark.pythons("3.7.0")
+    @pytest.mark.all_pythons("3.6.0", "3.7.0")
+    def test_install_invalidate(self, asdf, popen, CFG):
+        plugin.RUN.resolved["python3.8"] = None
+        CFG.install = True
+        assert plugin.tox_get_python_executable(EnvConfig()) == asdf.python_bin("3.6.0")
+        assert "python3.8" not in plugin.RUN.resolved
+        assert plugin.RUN.installed is None
+
+
+class TestPrefetchPythons:
+    @pytest.fixture(autouse=True)
+    def setup(self, CFG):
+        CFG.cache = False
+        CFG.resolver = "cli"
+
+    @pytest.mark.pythons("3.6.0", "3.7.0")
+    def test_collect_prefetched(self, asdf, mocker):
+        resolve = mocker.spy(plugin, "get_python_executable")
+        envconfigs = [EnvConfig("python3.6"), EnvConfig("python3.6"), EnvConfig("*TEST*")]
+        plugin.prefetch_pythons(envconfigs)
+        assert set(plugin.RUN.prefetched) == {"python3.6"}
+        assert plugin.tox_get_python_executable(EnvConfig()) == asdf.python_bin("3.6.0")
+        resolve.assert_called_once_with("python3.6")
+
+    @pytest.mark.pythons("3.6.0", "3.7.0", "3.8.0")
+    def test_list_installed_once(self, asdf, mocker):
+        list_installed = mocker.spy(plugin, "asdf_list_installed")
+        plugin.prefetch_pythons([EnvConfig("python3.6"), EnvConfig("python3.7")])
+        for future in plugin.RUN.prefetched.values():
+            future.result()
+        list_installed.assert_called_once()
+
+    @pytest.mark.pythons("3.6.0")
+    def test_error(self, asdf, CFG):
+        CFG.no_fallback = True
+        plugin.prefetch_pythons([EnvConfig("python3.7")])
+        with pytest.raises(plugin.AsdfError):
+            plugin.tox_get_python_executable(EnvConfig("python3.7"))
+
+
+class TestScheduleInstalls:
+    @pytest.fixture(autouse=True)
+    def setup(self, CFG):
+        CFG.cache = False
+        CFG.install = True
+
+    @pytest.mark.pythons("3.7.0")
+    @pytest.mark.all_pythons("3.6.0", "3.7.0", "3.8.0")
+    def test_schedule_missing_versions(self, asdf, mocker):
+        install = mocker.spy(plugin, "asdf_install_version")
+        envconfigs = [EnvConfig("python3.6"), EnvConfig("python3.7"), EnvConfig("python3.8")]
+        plugin.schedule_installs(envconfigs)
+        assert set(plugin.RUN.installs) == {"3.6", "3.8"}
+        assert plugin.RUN.installs["3.6"].result() == "3.6.0"
+        assert plugin.RUN.installs["3.8"].result() == "3.8.0"
+        assert sorted(c[0][0] for c in install.call_args_list) == ["3.6.0", "3.8.0"]
+
+    @pytest.mark.all_pythons("3.6.0", "pypy3.8-7.0.0")
+    def test_install_same_version_once(self, asdf, mocker):
+        install = mocker.spy(plugin, "asdf_install_version")
+        plugin.schedule_installs([EnvConfig("python3"), EnvConfig("python3.6")])
+        assert plugin.RUN.installs["3"] is plugin.RUN.installs["3.6"]
+        plugin.RUN.installs["3"].result()
+        install.assert_called_once_with("3.6.0")
+
+    @pytest.mark.pythons("3.6.0")
+    def test_nothing_missing(self, asdf):
+        plugin.schedule_installs([EnvConfig("python3.6"), EnvConfig("*TEST*")])
+        assert plugin.RUN.installs == {}
+
+    @pytest.mark.asdf_missing
+    def test_asdf_error(self, asdf, LOG):
+        plugin.schedule_installs([EnvConfig("python3.6")])
+        assert plugin.RUN.installs == {}
+        LOG.error.assert_called_once()
+
+    @pytest.mark.all_pythons("3.6.0")
+    def test_use_scheduled_install(self, asdf, mocker, CFG):
+        # The install creates the installs directory which would switch the auto resolver
+        CFG.resolver = "cli"
+        plugin.schedule_installs([EnvConfig()])
+        install = mocker.spy(plugin, "asdf_install")
+        assert plugin.tox_get_python_executable(EnvConfig()) == asdf.python_bin("3.6.0")
+        install.assert_not_called()
+
+    def test_install_jobs(self, CFG):
+        CFG.install_jobs = 3
+        assert plugin.install_jobs() == 3
+
+    def test_install_jobs_bounded_by_memory(self, mocker):
+        mocker.patch("os.cpu_count", return_value=16)
+        sysconf = {"SC_PHYS_PAGES": 1024**2, "SC_PAGE_SIZE": 4096}
+        mocker.patch("os.sysconf", side_effect=sysconf.get)
+        assert plugin.install_jobs() == 4
+
+    def test_install_jobs_bounded_by_cpus(self, mocker):
+        mocker.patch("os.cpu_count", return_value=2)
+        mocker.patch("os.sysconf", return_value=1024**3)
+        assert plugin.install_jobs() == 2
+
 
 class TestToxGetPythonExecutableNoFallback:
     @pytest.fixture(autouse=True)
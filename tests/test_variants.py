@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import pytest
+from conftest import fake_pythons
+
+from tox_asdf import plugin
+
+BUILDS = {
+    "3.12.0": {"config_args": "--enable-optimizations --with-lto"},
+    "3.12.1": {"config_args": "--enable-shared"},
+    "3.12.2": {"config_args": "--with-pydebug", "py_debug": True},
+    "3.13.0": {"config_args": ""},
+    "3.13.0t": {"config_args": "--disable-gil", "py_gil_disabled": True},
+}
+
+
+@pytest.fixture(name="installs")
+def fake_builds(monkeypatch, tmp_path):
+    """asdf installs of several builds, whose metadata tell their variant"""
+    root = fake_pythons(tmp_path / "asdf" / "installs" / "python", *BUILDS, builds=BUILDS)
+    monkeypatch.setenv("ASDF_DATA_DIR", str(tmp_path / "asdf"))
+    return root
+
+
+def test_freethreaded_prefixes():
+    index = plugin.VersionIndex(["3.13.0", "3.13.1t", "3.13.10t", "3.14.0t"])
+    assert index.best("3.13") == "3.13.0"
+    assert index.best("3.13t") == "3.13.10t"
+    assert index.best("3t") == "3.14.0t"
+    assert index.best("") == "3.13.0"
+
+
+def test_matching():
+    index = plugin.VersionIndex(["3.12.0", "3.12.10", "3.12.2", "3.1.0", "3.12.3t"])
+    assert index.matching("3.12") == ["3.12.10", "3.12.2", "3.12.0"]
+
+
+@pytest.mark.parametrize(
+    "build,expected",
+    [
+        ({"config_args": "'--enable-optimizations'"}, {"optimized"}),
+        ({"config_args": "--with-lto --enable-shared", "py_debug": True}, {"optimized", "debug"}),
+        ({"config_args": None, "py_gil_disabled": True}, {"freethreaded"}),
+        ({}, set()),
+    ],
+)
+def test_build_traits(build, expected):
+    assert plugin.build_traits({"build": build}) == expected
+
+
+class TestVariants:
+    def resolve(self, basepython, variant=None):
+        envconfig = SimpleNamespace(envname="py", basepython=basepython, asdf_variant=variant)
+        plugin.parse_envs_variants([envconfig])
+        return plugin.get_python_executable(basepython)
+
+    def test_no_variant(self, installs, LOG):
+        assert self.resolve("python3.12") == str(installs / "3.12.2" / "bin" / "python")
+        LOG.warning.assert_called_once()
+
+    def test_default_skips_debug(self, installs):
+        assert self.resolve("python3.12", "default") == str(installs / "3.12.1" / "bin" / "python")
+
+    def test_optimized(self, installs):
+        assert self.resolve("python3.12", "optimized") == str(
+            installs / "3.12.0" / "bin" / "python"
+        )
+        assert plugin.RUN.build_profiles == {"3.12": "optimized"}
+
+    def test_optimized_fallback(self, installs, LOG):
+        assert self.resolve("python3.13", "optimized") == str(
+            installs / "3.13.0" / "bin" / "python"
+        )
+        LOG.warning.assert_called_once()
+
+    def test_debug(self, installs):
+        assert self.resolve("python3.12", "debug") == str(installs / "3.12.2" / "bin" / "python")
+
+    def test_debug_missing(self, installs, CFG):
+        CFG.install = True
+        assert self.resolve("python3.13", "debug") is None
+
+    def test_freethreaded(self, installs):
+        python = str(installs / "3.13.0t" / "bin" / "python")
+        assert self.resolve("python3.13", "freethreaded") == python
+
+    def test_freethreaded_basepython(self, installs):
+        assert self.resolve("python3.13t") == str(installs / "3.13.0t" / "bin" / "python")
+
+    def test_cached_per_variant(self, installs):
+        self.resolve("python3.12", "optimized")
+        plugin.RUN = plugin.RunState()
+        assert self.resolve("python3.12", "default") == str(installs / "3.12.1" / "bin" / "python")
+
+    def test_install_freethreaded(self, installs, CFG, mocker):
+        CFG.install = True
+        install = mocker.patch.object(plugin, "asdf_install", return_value=None)
+        self.resolve("python3.14", "freethreaded")
+        install.assert_called_once_with("3.14t")
@@ -107,3 +107,52 @@ def test_pypy3(version, match):
 def test_pypy3_not_found():
     versions = "2.7.0", "3.6.0", "3.7.0", "pypy2.7-6.0.0"
     assert plugin.best_version("pypy3.5", versions) is None
+
+
+def test_segment_boundary():
+    versions = "3.1.4", "3.10.0", "3.10.5"
+    assert plugin.best_version("3.1", versions) == "3.1.4"
+    assert plugin.best_version("3.10", versions) == "3.10.5"
+
+
+def test_flavour_boundary():
+    versions = "anaconda-3.0.0", "anaconda3-2019.10"
+    assert plugin.best_version("anaconda", versions) == "anaconda-3.0.0"
+    assert plugin.best_version("anaconda3", versions) == "anaconda3-2019.10"
+
+
+def test_exact_version():
+    versions = "3.6.0", "3.6.1"
+    assert plugin.best_version("3.6.0", versions) == "3.6.0"
+
+
+def test_ignore_unparsable_versions():
+    versions = "3.13.0", "3.13t-dev", "miniconda3-latest", "miniconda3-4.7.12"
+    assert plugin.best_version("3.13", versions) == "3.13.0"
+    assert plugin.best_version("miniconda3", versions) == "miniconda3-4.7.12"
+
+
+def test_unparsable_version_only():
+    assert plugin.best_version("stackless", ["stackless-dev"]) == "stackless-dev"
+
+
+class TestVersionIndex:
+    def test_reusable(self):
+        index = plugin.VersionIndex(["2.7.18", "3.6.0", "3.6.1", "pypy3.8-7.0.0"])
+        assert plugin.best_version("3.6", index) == "3.6.1"
+        assert plugin.best_version("2", index) == "2.7.18"
+        assert plugin.best_version("pypy3", index) == "pypy3.8-7.0.0"
+        assert plugin.best_version("3.7", index) is None
+
+    def test_sequence(self):
+        index = plugin.VersionIndex(iter(["3.6.0", "3.7.0"]))
+        assert list(index) == ["3.6.0", "3.7.0"]
+        assert len(index) == 2
+        assert "3.6.0" in index
+
+    def test_build_once(self, mocker):
+        index = plugin.VersionIndex(["3.6.0", "3.7.0"])
+        key = mocker.spy(plugin, "_version_key")
+        plugin.best_version("3.6", index)
+        plugin.best_version("3.7", index)
+        key.assert_not_called()
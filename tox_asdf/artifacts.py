@@ -0,0 +1,112 @@
+"""A store of prebuilt interpreters archives"""
+
+import hashlib
+import json
+import os
+import shutil
+import sysconfig
+import tarfile
+import tempfile
+
+#: Environment variables changing the built interpreter
+BUILD_ENV = (
+    "PYTHON_CONFIGURE_OPTS",
+    "PYTHON_CFLAGS",
+    "CONFIGURE_OPTS",
+    "CFLAGS",
+    "CPPFLAGS",
+    "LDFLAGS",
+)
+
+
+class ChecksumMismatch(Exception):
+    """An archive does not match its recorded checksum"""
+
+
+def platform_tag():
+    return sysconfig.get_platform().replace("-", "_").replace(".", "_")
+
+
+def build_options(prefix, env=None):
+    """The build parameters which must match for an archive to be reusable"""
+    env = os.environ if env is None else env
+    options = {key: env[key] for key in BUILD_ENV if env.get(key)}
+    # python-build installs are not fully relocatable
+    options["prefix"] = prefix
+    return options
+
+
+def artifact_name(version, options):
+    digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()
+    return "python-{}-{}-{}.tar.gz".format(version, platform_tag(), digest[:12])
+
+
+def sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore(object):
+    """
+    A directory (local or mounted) of compressed interpreters installs.
+
+    Each archive has a ``.sha256`` sidecar file checked before unpacking.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def has(self, name):
+        return os.path.exists(self.path(name)) and os.path.exists(self.path(name) + ".sha256")
+
+    def restore(self, name, dest):
+        """
+        Unpack an archive into ``dest``.
+
+        Returns ``False`` if the archive does not exist,
+        raises `ChecksumMismatch` if it is corrupted.
+        """
+        if not self.has(name):
+            return False
+        archive = self.path(name)
+        with open(archive + ".sha256") as f:
+            expected = f.read().split()[0]
+        if sha256(archive) != expected:
+            raise ChecksumMismatch("{} does not match its checksum".format(archive))
+        parent = os.path.dirname(dest)
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".restore-", dir=parent)
+        try:
+            with tarfile.open(archive, "r:gz") as tar:
+                if hasattr(tarfile, "data_filter"):
+                    tar.extractall(staging, filter="data")
+                else:
+                    tar.extractall(staging)
+            os.rename(os.path.join(staging, "install"), dest)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return True
+
+    def save(self, name, source):
+        """Pack ``source`` into the store, atomically"""
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=self.root)
+        os.close(fd)
+        try:
+            with tarfile.open(tmp, "w:gz") as tar:
+                tar.add(source, arcname="install")
+            checksum = sha256(tmp)
+            with open(tmp + ".sha256", "w") as f:
+                f.write("{}  {}\n".format(checksum, name))
+            os.replace(tmp, self.path(name))
+            os.replace(tmp + ".sha256", self.path(name) + ".sha256")
+        finally:
+            for path in (tmp, tmp + ".sha256"):
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,298 @@
+"""
+The version managers providing pythons: asdf, mise, pyenv or a plain directory of installs.
+
+Backends rely on the plugin for listing, resolving and running commands.
+As the plugin imports this module too, its names are only looked up when called.
+"""
+
+import os
+import shutil
+
+from tox_asdf import plugin
+
+
+def mise_data_dir():
+    """Get the mise data directory"""
+    if os.environ.get("MISE_DATA_DIR"):
+        return os.environ["MISE_DATA_DIR"]
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(
+        os.path.expanduser("~"), ".local", "share"
+    )
+    return os.path.join(data_home, "mise")
+
+
+def pyenv_root():
+    """Get the pyenv root directory"""
+    return os.environ.get("PYENV_ROOT") or os.path.join(os.path.expanduser("~"), ".pyenv")
+
+
+class Backend(object):
+    """
+    A version manager providing pythons as ``<installs>/<version>/bin/python``.
+
+    The base backend is a plain directory of installs: it lists and resolves them
+    without spawning anything but cannot install new ones.
+    """
+
+    name = "directory"
+    #: Whether restored installs need shims
+    shims = False
+    #: Whether pythons can be installed
+    installable = False
+    #: Whether the installable versions can be updated
+    updatable = False
+
+    def __init__(self, root=None):
+        self._root = root
+
+    @property
+    def root(self):
+        """The directory keying the caches"""
+        return self._root
+
+    @property
+    def installs(self):
+        return self._root
+
+    @property
+    def search_path(self):
+        """The installs directories resolutions depend on"""
+        return self.installs
+
+    def list_installed(self):
+        return plugin.fs_list_installed(self.installs)
+
+    def get_installed(self, version):
+        """Get the best matching installed version"""
+        return plugin.best_version(version, plugin.installed_index(self.list_installed))
+
+    def which(self, version):
+        """Get the python binary path for a given installed version"""
+        python = os.path.join(self.installs, version, "bin", "python")
+        if not os.access(python, os.X_OK):
+            raise plugin.AsdfError("No python executable found for version {}", version)
+        return python
+
+    def resolver(self):
+        """Get the ``(get_installed, which)`` pair"""
+        return self.get_installed, self.which
+
+    @property
+    def build_definitions(self):
+        """The python-build definitions directory used for installs"""
+        return None
+
+    def list_all(self):
+        """List versions available for install"""
+        return []
+
+    def update(self):
+        """Update the versions available for install"""
+
+    def install(self, version, env=None):
+        """Install an exact version"""
+        raise plugin.AsdfError("The {} backend cannot install python {}", self.name, version)
+
+
+class AsdfBackend(Backend):
+    """asdf, resolved with the configured resolver"""
+
+    name = "asdf"
+    shims = True
+    installable = True
+    updatable = True
+
+    @property
+    def root(self):
+        return plugin.asdf_data_dir()
+
+    @property
+    def installs(self):
+        return plugin.asdf_python_installs()
+
+    @property
+    def build_definitions(self):
+        python_build = os.path.join(self.root, "plugins", "python", "pyenv", plugin.PYTHON_BUILD)
+        return os.path.join(python_build, "share", "python-build")
+
+    def list_installed(self):
+        if os.path.isdir(self.installs):
+            return plugin.fs_list_installed(self.installs)
+        return plugin.asdf_list_installed()
+
+    def resolver(self):
+        return plugin.get_resolver()
+
+    def list_all(self):
+        return plugin.asdf_list_all()
+
+    def update(self):
+        plugin.asdf_plugin_update()
+
+    def install(self, version, env=None):
+        plugin.run_asdf("install python {}".format(version), capture=False, env=env)
+
+
+class MiseBackend(Backend):
+    """mise, sharing the asdf installs layout"""
+
+    name = "mise"
+    installable = True
+
+    @property
+    def root(self):
+        return mise_data_dir()
+
+    @property
+    def installs(self):
+        return os.path.join(self.root, "installs", "python")
+
+    @property
+    def build_definitions(self):
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+        cache = os.environ.get("MISE_CACHE_DIR") or os.path.join(cache_home, "mise")
+        python_build = os.path.join(cache, "python", "pyenv", plugin.PYTHON_BUILD)
+        return os.path.join(python_build, "share", "python-build")
+
+    def list_installed(self):
+        # mise links partial versions (`3.12`, `latest`...) to the installs
+        versions = plugin.fs_list_installed(self.installs)
+        return [v for v in versions if not os.path.islink(os.path.join(self.installs, v))]
+
+    def list_all(self):
+        output = plugin.run_shell(
+            "mise ls-remote python",
+            merge_stderr=False,
+            timeout=plugin.CFG.timeout,
+            retries=plugin.CFG.retries,
+        )
+        return plugin.parse_versions(output)
+
+    def install(self, version, env=None):
+        cmd = "mise install python@{}".format(version)
+        plugin.run_shell(cmd, capture=False, timeout=plugin.CFG.install_timeout, env=env)
+
+
+class PyenvBackend(Backend):
+    """pyenv, whose python-build is also used by the asdf python plugin"""
+
+    name = "pyenv"
+    installable = True
+
+    @property
+    def root(self):
+        return pyenv_root()
+
+    @property
+    def installs(self):
+        return os.path.join(self.root, "versions")
+
+    @property
+    def build_definitions(self):
+        return os.path.join(self.root, plugin.PYTHON_BUILD, "share", "python-build")
+
+    def list_all(self):
+        output = plugin.run_shell(
+            "pyenv install --list",
+            merge_stderr=False,
+            timeout=plugin.CFG.timeout,
+            retries=plugin.CFG.retries,
+        )
+        return [version for version in plugin.parse_versions(output) if not version.endswith(":")]
+
+    def install(self, version, env=None):
+        cmd = "pyenv install --skip-existing {}".format(version)
+        plugin.run_shell(cmd, capture=False, timeout=plugin.CFG.install_timeout, env=env)
+
+
+class TieredBackend(object):
+    """
+    A backend also finding installs in other (shared, slower) roots.
+
+    All the roots are merged into a single index, each version being used
+    from the first root having it, or copied from there into the local installs.
+    """
+
+    def __init__(self, backend, roots, copy_on_demand=False):
+        self.backend = backend
+        self.roots = roots
+        self.copy_on_demand = copy_on_demand
+        self.locations = {}
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    @property
+    def search_path(self):
+        """The installs directories in search order, the local one first unless listed"""
+        local = os.path.abspath(self.backend.installs)
+        roots = [os.path.abspath(root) for root in self.roots]
+        return tuple(roots if local in roots else [local] + roots)
+
+    def list_installed(self):
+        locations = {}
+        for root in self.search_path:
+            if not os.path.isdir(root):
+                plugin.LOG.debug("Skipping missing installs root {}", root)
+                continue
+            try:
+                versions = plugin.fs_list_installed(root)
+            except plugin.AsdfError as e:
+                plugin.LOG.warning(e)
+                continue
+            for version in versions:
+                locations.setdefault(version, root)
+        self.locations = locations
+        return list(locations)
+
+    def get_installed(self, version):
+        return plugin.best_version(version, plugin.installed_index(self.list_installed))
+
+    def locate(self, version):
+        """Get the python binary path of a version where it is, without copying it"""
+        root = self.locations.get(version, os.path.abspath(self.backend.installs))
+        python = os.path.join(root, version, "bin", "python")
+        if not os.access(python, os.X_OK):
+            raise plugin.AsdfError("No python executable found for version {}", version)
+        return python
+
+    def which(self, version):
+        local = os.path.abspath(self.backend.installs)
+        root = self.locations.get(version, local)
+        if root != local and self.copy_on_demand:
+            try:
+                plugin.copy_install(root, version)
+            except (OSError, shutil.Error) as e:
+                plugin.LOG.warning("Unable to copy python {} from {}: {}", version, root, e)
+            else:
+                self.locations[version] = local
+        return self.locate(version)
+
+    def resolver(self):
+        return self.get_installed, self.which
+
+
+def select_backend(name, pythons_dir=None):
+    """
+    Instantiate a backend by name, ``pythons_dir`` being the installs of the directory backend.
+
+    ``auto`` picks the first backend having an installs directory
+    (resolved without spawning anything), falling back on asdf.
+    """
+    backends = {
+        "asdf": AsdfBackend,
+        "mise": MiseBackend,
+        "pyenv": PyenvBackend,
+    }
+    if name == "directory":
+        return Backend(pythons_dir)
+    if name in backends:
+        return backends[name]()
+    candidates = [Backend(pythons_dir)] if pythons_dir else []
+    candidates.extend(cls() for cls in backends.values())
+    for backend in candidates:
+        if os.path.isdir(backend.installs):
+            return backend
+    return AsdfBackend()
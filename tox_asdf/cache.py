@@ -0,0 +1,207 @@
+"""Caches persisted across tox runs"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+def default_cache_dir():
+    """Get the cache directory, following the XDG base directory specification"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "tox-asdf")
+
+
+def fingerprint(path):
+    """A cheap (single `stat`) fingerprint changing whenever ``path`` is modified"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+
+class JsonStore:
+    """
+    A lazily loaded JSON document written atomically.
+
+    Stores may be shared by threads (prefetch), changes and writes are done under `lock`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._data = None
+        self.lock = threading.RLock()
+
+    @property
+    def data(self):
+        with self.lock:
+            if self._data is None:
+                try:
+                    with open(self.path) as f:
+                        self._data = json.load(f)
+                except (OSError, ValueError):
+                    self._data = {}
+                if not isinstance(self._data, dict):
+                    self._data = {}
+            return self._data
+
+    def save(self):
+        try:
+            self.write()
+        except OSError:
+            # A cache must never break a run
+            pass
+
+    def write(self, **kwargs):
+        """Write the document atomically, ``kwargs`` are given to `json.dump`"""
+        dirname = os.path.dirname(self.path)
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=dirname, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w") as f, self.lock:
+                json.dump(self.data, f, **kwargs)
+            os.replace(tmp, self.path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+class CacheStore(JsonStore):
+    """A JSON document stored in the cache directory"""
+
+    FILENAME: str
+
+    def __init__(self, cache_dir):
+        super().__init__(os.path.join(cache_dir, self.FILENAME))
+        self.cache_dir = cache_dir
+
+
+class ResolutionCache(CacheStore):
+    """
+    Map requested versions to their resolved interpreter path.
+
+    Entries are grouped by installs directory (or directories, searched in order)
+    and dropped as soon as one of them changes (version added or removed).
+    Each entry is also validated against its interpreter fingerprint.
+    """
+
+    FILENAME = "resolutions.json"
+
+    @staticmethod
+    def key(installs):
+        return installs if isinstance(installs, str) else os.pathsep.join(installs)
+
+    @staticmethod
+    def fingerprint(installs):
+        if isinstance(installs, str):
+            return fingerprint(installs)
+        # A missing directory is part of the fingerprint: creating it changes it
+        return [fingerprint(path) for path in installs]
+
+    def get(self, installs, version):
+        entry = self.data.get(self.key(installs))
+        if not entry or entry.get("fingerprint") != self.fingerprint(installs):
+            return None
+        resolved = entry["versions"].get(version)
+        if not resolved or resolved.get("fingerprint") != fingerprint(resolved["python"]):
+            return None
+        return resolved["python"]
+
+    def set(self, installs, version, python):
+        installs_fingerprint = self.fingerprint(installs)
+        python_fingerprint = fingerprint(python)
+        if installs_fingerprint is None or python_fingerprint is None:
+            return
+        key = self.key(installs)
+        with self.lock:
+            entry = self.data.get(key)
+            if not entry or entry.get("fingerprint") != installs_fingerprint:
+                entry = self.data[key] = {"fingerprint": installs_fingerprint, "versions": {}}
+            entry["versions"][version] = {"python": python, "fingerprint": python_fingerprint}
+            self.save()
+
+
+class AvailableVersionsCache(CacheStore):
+    """
+    Versions available for install (`asdf list-all python`) per asdf data directory.
+
+    Also tracks when the python plugin has been updated for throttling.
+    """
+
+    FILENAME = "available.json"
+
+    def get(self, data_dir, ttl=None):
+        """Get the cached versions if not older than ``ttl`` seconds"""
+        entry = self.data.get(data_dir) or {}
+        if "versions" not in entry:
+            return None
+        if ttl is not None and time.time() - entry.get("timestamp", 0) > ttl:
+            return None
+        return entry["versions"]
+
+    def set(self, data_dir, versions):
+        with self.lock:
+            entry = self.data.setdefault(data_dir, {})
+            entry["versions"] = versions
+            entry["timestamp"] = time.time()
+            self.save()
+
+    def plugin_updated_within(self, data_dir, interval):
+        entry = self.data.get(data_dir) or {}
+        return time.time() - entry.get("plugin_updated", 0) < interval
+
+    def mark_plugin_updated(self, data_dir):
+        with self.lock:
+            self.data.setdefault(data_dir, {})["plugin_updated"] = time.time()
+            self.save()
+
+
+class InterpreterInfoCache(CacheStore):
+    """Interpreters metadata, valid as long as the interpreter binary is unchanged"""
+
+    FILENAME = "interpreters.json"
+
+    def get(self, python):
+        entry = self.data.get(python)
+        if not entry or entry.get("fingerprint") != fingerprint(python):
+            return None
+        return entry["info"]
+
+    def set(self, python, info):
+        python_fingerprint = fingerprint(python)
+        if python_fingerprint is None:
+            return
+        with self.lock:
+            self.data[python] = {"fingerprint": python_fingerprint, "info": info}
+            self.save()
+
+
+class UsageCache(CacheStore):
+    """When each installed version has last been used, per installs directory"""
+
+    FILENAME = "usage.json"
+
+    def reload(self):
+        # Several runs may update it concurrently
+        self._data = None
+
+    def last_used(self, installs):
+        with self.lock:
+            self.reload()
+            return dict(self.data.get(installs, {}))
+
+    def touch(self, installs, version):
+        with self.lock:
+            self.reload()
+            self.data.setdefault(installs, {})[version] = time.time()
+            self.save()
+
+    def forget(self, installs, versions):
+        with self.lock:
+            self.reload()
+            entry = self.data.get(installs, {})
+            for version in versions:
+                entry.pop(version, None)
+            self.save()
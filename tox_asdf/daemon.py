@@ -0,0 +1,208 @@
+"""
+A resolver daemon keeping the installed pythons indexed in memory.
+
+Run it with ``tox-asdf-daemon`` (or ``python -m tox_asdf.daemon``):
+tox runs then resolve installed versions with a single local socket round-trip
+and fall back on resolving by themselves when it is not running.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+
+from tox_asdf import plugin
+from tox_asdf.cache import fingerprint
+
+# inotify(7) constants
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+_libc = None
+
+
+def libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    if not hasattr(_libc, "inotify_init1"):
+        raise OSError("inotify is not available")
+    return _libc
+
+
+class InotifyWatcher(object):
+    """Watch a directory entries with inotify (Linux only)"""
+
+    def __init__(self, path):
+        lib = libc()
+        self.fd = lib.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if lib.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "Unable to watch {}".format(path))
+
+    def changed(self):
+        """Whether some events have been received, consuming them"""
+        changed = False
+        while True:
+            try:
+                if not os.read(self.fd, 64 * 1024):
+                    return changed
+            except BlockingIOError:
+                return changed
+            changed = True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class StatWatcher(object):
+    """Watch a directory entries by its modification time (a `stat` per check)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.fingerprint = fingerprint(path)
+
+    def changed(self):
+        return fingerprint(self.path) != self.fingerprint
+
+    def close(self):
+        pass
+
+
+def watch(path):
+    """Watch a directory with inotify if available, with `stat` otherwise"""
+    try:
+        return InotifyWatcher(path)
+    except OSError:
+        return StatWatcher(path)
+
+
+class InstallsIndex(object):
+    """The installed versions index of an installs directory, rebuilt whenever it changes"""
+
+    def __init__(self, installs):
+        self.installs = installs
+        self.watcher = None
+        self.index = None
+
+    def get(self):
+        if self.watcher is None or self.watcher.changed():
+            if self.watcher is not None:
+                self.watcher.close()
+            # Watch before listing so no change is missed
+            self.watcher = watch(self.installs)
+            try:
+                self.index = plugin.VersionIndex(plugin.fs_list_installed(self.installs))
+            except plugin.AsdfError:
+                self.watcher.close()
+                self.watcher = None
+                raise
+        return self.index
+
+    def close(self):
+        if self.watcher is not None:
+            self.watcher.close()
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Answer a single JSON line request with a JSON line response"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            # A connection probe (see `is_listening`)
+            return
+        try:
+            request = json.loads(line)
+            response = self.server.resolve(request["installs"], request["version"])
+        except (ValueError, KeyError, TypeError) as e:
+            response = {"error": "Invalid request: {}".format(e)}
+        except plugin.AsdfError as e:
+            response = {"error": str(e)}
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+def is_listening(path):
+    """Whether something answers on the Unix socket ``path``"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(plugin.DAEMON_TIMEOUT)
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+class ResolverDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Resolve installed versions from in-memory indexes, one per installs directory"""
+
+    daemon_threads = True
+
+    def __init__(self, path):
+        if os.path.exists(path):
+            if is_listening(path):
+                raise plugin.AsdfError("A resolver daemon is already listening on {}", path)
+            # Left by a daemon which has not been stopped cleanly
+            os.remove(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        super().__init__(path, RequestHandler)
+        self.path = path
+        self.indexes = {}
+        self.lock = threading.Lock()
+
+    def resolve(self, installs, version):
+        with self.lock:
+            index = self.indexes.get(installs)
+            if index is None:
+                index = self.indexes[installs] = InstallsIndex(installs)
+            return {"version": index.get().best(version)}
+
+    def server_close(self):
+        super().server_close()
+        for index in self.indexes.values():
+            index.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="tox-asdf resolver daemon")
+    parser.add_argument(
+        "--socket",
+        default=plugin.daemon_socket(),
+        help="The Unix socket to listen on (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    try:
+        server = ResolverDaemon(args.socket)
+    except plugin.AsdfError as e:
+        parser.exit(1, "{}\n".format(e))
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print("Listening on {}".format(args.socket), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
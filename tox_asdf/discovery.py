@@ -0,0 +1,50 @@
+"""A virtualenv discovery plugin finding interpreters with tox-asdf"""
+
+import os
+import re
+
+from virtualenv.discovery.builtin import Builtin, get_interpreter
+
+SPEC_RE = re.compile(r"^(?:c?python|py)?(?P<major>\d)(?:\.?(?P<minor>\d+))?(?:\.(?P<patch>\d+))?$")
+
+
+def basepython_from_spec(spec):
+    """Convert a virtualenv python spec (``3.11``, ``py311``, ``python3.11``...) into a basepython"""
+    if os.sep in spec or (os.altsep and os.altsep in spec):
+        return None
+    if spec in ("pypy", "pypy3"):
+        return spec
+    match = SPEC_RE.match(spec)
+    if not match:
+        return None
+    return "python" + ".".join(part for part in match.group("major", "minor", "patch") if part)
+
+
+class AsdfDiscovery(Builtin):
+    """
+    Find interpreters among asdf installs, falling back on the builtin discovery.
+
+    Use it with ``virtualenv --discovery asdf`` or ``VIRTUALENV_DISCOVERY=asdf``.
+    """
+
+    def run(self):
+        for spec in self.python_spec:
+            python = self.asdf_python(spec)
+            if python:
+                interpreter = get_interpreter(python, [], app_data=self.app_data, env=self._env)
+                if interpreter is not None:
+                    return interpreter
+        return super().run()
+
+    def asdf_python(self, spec):
+        basepython = basepython_from_spec(spec)
+        if basepython is None:
+            return None
+        # virtualenv loads all discovery plugins on every run: only pay for tox when used
+        from tox_asdf import plugin
+
+        try:
+            return plugin.get_python_executable(basepython)
+        except plugin.AsdfError as e:
+            plugin.LOG.error(e)
+            return None
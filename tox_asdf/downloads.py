@@ -0,0 +1,90 @@
+"""A content-addressed cache of the packages downloaded by python-build"""
+
+import hashlib
+import os
+import re
+import shlex
+import tempfile
+import urllib.parse
+import urllib.request
+
+from tox_asdf.artifacts import ChecksumMismatch
+
+#: A package line of a python-build definition
+PACKAGE_RE = re.compile(r"^\s*install_package\s+(?P<args>.+)$")
+
+
+def build_packages(path):
+    """
+    List the ``(name, url, sha256)`` of the packages a python-build definition downloads.
+
+    Conditional packages (``--if``), packages without a checksum
+    and `else` alternatives (``.tgz`` when ``.tar.xz`` is supported...) are skipped.
+    Definitions computing their URLs (PyPy binaries) list nothing.
+    """
+    with open(path) as f:
+        lines = f.read().splitlines()
+    packages = []
+    alternative = False
+    for line in lines:
+        keyword = line.strip()
+        if keyword == "else":
+            alternative = True
+        elif keyword == "fi":
+            alternative = False
+        match = PACKAGE_RE.match(line)
+        if alternative or not match:
+            continue
+        args = shlex.split(match.group("args"), comments=True)
+        if len(args) < 2 or "--if" in args:
+            continue
+        url, _, checksum = args[1].partition("#")
+        if checksum and "$" not in url:
+            packages.append((args[0], url, checksum))
+    return packages
+
+
+class DownloadCache(object):
+    """
+    A directory of downloaded packages named by their sha256.
+
+    It is laid out as a python-build mirror (``PYTHON_BUILD_MIRROR_URL``)
+    so builds read their packages from it instead of downloading them.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, checksum):
+        return os.path.join(self.root, checksum)
+
+    def has(self, checksum):
+        return os.path.exists(self.path(checksum))
+
+    def mirror_url(self):
+        return "file://" + urllib.parse.quote(os.path.abspath(self.root))
+
+    def fetch(self, url, checksum, timeout=None):
+        """
+        Download ``url`` into the cache unless already there, atomically.
+
+        Returns whether it has been downloaded,
+        raises `ChecksumMismatch` if it does not match ``checksum``.
+        """
+        if self.has(checksum):
+            return False
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=self.root)
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, "wb") as f, urllib.request.urlopen(url, timeout=timeout) as response:
+                for chunk in iter(lambda: response.read(1024 * 1024), b""):
+                    digest.update(chunk)
+                    f.write(chunk)
+            if digest.hexdigest() != checksum:
+                raise ChecksumMismatch("{} does not match its checksum {}".format(url, checksum))
+            os.replace(tmp, self.path(checksum))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return True
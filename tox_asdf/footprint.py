@@ -0,0 +1,120 @@
+"""Disk footprint of the asdf python installs: sizes, eviction and deduplication"""
+
+import filecmp
+import os
+import re
+import stat
+
+from tox_asdf.tools import parse_tool_versions, tool_versions_files
+
+SIZE_RE = re.compile(r"^\s*(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>[KMGT]?)i?B?\s*$", re.IGNORECASE)
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+#: Directories never deduplicated: their files may be modified in place
+DEDUPE_EXCLUDE = ("site-packages",)
+
+
+def parse_size(value):
+    """Parse a size in bytes, optionally with a binary unit suffix (``512M``, ``20G``...)"""
+    match = SIZE_RE.match(str(value))
+    if not match:
+        raise ValueError("Invalid size: {}".format(value))
+    return int(float(match.group("value")) * SIZE_UNITS[match.group("unit").upper()])
+
+
+def disk_usage(path):
+    """
+    The disk space used by a directory.
+
+    Hardlinked files are shared equally by their links
+    so the usage of several directories sharing files adds up to their total usage.
+    """
+    usage = 0.0
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            try:
+                st = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            if not stat.S_ISDIR(st.st_mode):
+                usage += st.st_blocks * 512 / max(st.st_nlink, 1)
+    return int(usage)
+
+
+def tool_versions_pins(directory, home=None):
+    """
+    Get the python versions pinned by the `.tool-versions` files asdf would read from ``directory``.
+
+    As asdf, look into ``directory``, its parents and the home directory.
+    """
+    pins = set()
+    for path in tool_versions_files(directory, home):
+        versions = parse_tool_versions(path).get("python", [])
+        pins.update(version for version in versions if version != "system" and ":" not in version)
+    return pins
+
+
+def select_evictions(last_used, sizes, protected=(), max_versions=None, max_size=None):
+    """
+    Pick the least recently used versions to remove to fit the quotas.
+
+    ``last_used`` maps every installed version to its last use timestamp (`None` if unknown)
+    and ``sizes`` to its disk usage. Protected versions are never picked.
+    """
+    candidates = sorted(
+        (version for version in last_used if version not in protected),
+        key=lambda version: (last_used[version] or 0, version),
+    )
+    count = len(last_used)
+    size = sum(sizes.values())
+    evictions = []
+    for version in candidates:
+        over_count = max_versions is not None and count > max_versions
+        over_size = max_size is not None and size > max_size
+        if not (over_count or over_size):
+            break
+        evictions.append(version)
+        count -= 1
+        size -= sizes.get(version, 0)
+    return evictions
+
+
+def dedupe(homes):
+    """
+    Hardlink identical files found at the same place in several installs.
+
+    Python sources are only linked if they have the same modification time too,
+    their bytecode records it and would be stale otherwise.
+    Return the number of bytes saved.
+    """
+    seen = {}
+    saved = 0
+    for home in homes:
+        for root, dirs, files in os.walk(home):
+            dirs[:] = [name for name in dirs if name not in DEDUPE_EXCLUDE]
+            for name in files:
+                path = os.path.join(root, name)
+                st = os.lstat(path)
+                if not stat.S_ISREG(st.st_mode) or not st.st_size:
+                    continue
+                mtime = st.st_mtime_ns if name.endswith(".py") else None
+                key = (os.path.relpath(path, home), st.st_size, st.st_mode, mtime)
+                original = seen.setdefault(key, path)
+                if original == path:
+                    continue
+                ost = os.lstat(original)
+                if ost.st_dev != st.st_dev or ost.st_ino == st.st_ino:
+                    continue
+                if not filecmp.cmp(original, path, shallow=False):
+                    continue
+                tmp = path + ".tox-asdf-dedupe"
+                try:
+                    os.link(original, tmp)
+                    os.replace(tmp, path)
+                except OSError:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                    continue
+                if st.st_nlink == 1:
+                    saved += st.st_size
+    return saved
@@ -0,0 +1,43 @@
+"""A lock file pinning tox basepythons to asdf interpreters"""
+
+import os
+
+from tox_asdf.cache import JsonStore, fingerprint
+
+FILENAME = "tox-asdf.lock"
+
+
+class LockFile(JsonStore):
+    """
+    Map tox basepythons to the asdf version and interpreter they resolved to.
+
+    Each entry keeps the interpreter fingerprint and metadata
+    so it is validated and used with a single `stat`.
+    """
+
+    @property
+    def pythons(self):
+        return self.data.setdefault("pythons", {})
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def get(self, basepython):
+        return self.pythons.get(basepython)
+
+    def is_valid(self, entry):
+        """Whether the locked interpreter is unchanged"""
+        return fingerprint(entry["python"]) == entry["fingerprint"]
+
+    def set(self, basepython, version, python, info=None):
+        self.pythons[basepython] = {
+            "version": version,
+            "python": python,
+            "fingerprint": fingerprint(python),
+            "info": info,
+        }
+
+    def write(self, **kwargs):
+        kwargs.setdefault("indent", 2)
+        kwargs.setdefault("sort_keys", True)
+        super().write(**kwargs)
@@ -1,9 +1,58 @@
+import functools
+import json
 import logging
 import os
+import re
+import shlex
+import shutil
+import signal
+import socket
 import subprocess
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
 
 import tox
-from packaging.version import Version
+import tox.exception
+from packaging.version import InvalidVersion, Version
+from tox.interpreters import InterpreterInfo
+from tox.venv import cleanup_for_venv
+
+from tox_asdf import backends
+from tox_asdf.artifacts import (
+    ArtifactStore,
+    ChecksumMismatch,
+    artifact_name,
+    build_options,
+)
+from tox_asdf.cache import (
+    AvailableVersionsCache,
+    InterpreterInfoCache,
+    ResolutionCache,
+    UsageCache,
+    default_cache_dir,
+    fingerprint,
+)
+from tox_asdf.downloads import DownloadCache, build_packages
+from tox_asdf.footprint import (
+    dedupe,
+    disk_usage,
+    parse_size,
+    select_evictions,
+    tool_versions_pins,
+)
+from tox_asdf.lockfile import FILENAME as LOCK_FILENAME
+from tox_asdf.lockfile import LockFile
+from tox_asdf.templates import clone_template, ensure_template, template_key
+from tox_asdf.timings import Timings
+from tox_asdf.tools import parse_tools, read_tool_versions, version_env_var
 
 
 class AsdfError(Exception):
@@ -26,6 +75,18 @@ class AsdfPluginMissing(AsdfError, RuntimeError):
     """The asdf python plugin is not installed."""
 
 
+class AsdfTimeout(AsdfError):
+    """An asdf command did not complete in time."""
+
+
+#: Errors making any later asdf call pointless
+FATAL_ERRORS = (AsdfMissing, AsdfPluginMissing)
+
+
+#: Seconds before an asdf command (except installs) is considered hung
+DEFAULT_TIMEOUT = 120
+
+
 class Config(object):
     def __init__(self):
         self.verbose = False
@@ -34,6 +95,38 @@ class Config(object):
         self.install = False
         self.pypy2_version = "pypy2.7"
         self.pypy3_version = "pypy3.8"
+        self.resolver = "auto"
+        self.cache = True
+        self.cache_dir = None
+        self.install_jobs = 0
+        self.offline = False
+        self.list_all_ttl = 24 * 60 * 60
+        self.plugin_update_interval = 60 * 60
+        self.timings = False
+        self.timings_json = None
+        self.venv_templates = False
+        self.artifacts = None
+        self.lock = False
+        self.lock_strict = False
+        self.lock_file = LOCK_FILENAME
+        self.daemon_socket = None
+        self.timeout = DEFAULT_TIMEOUT
+        self.install_timeout = None
+        self.retries = 1
+        self.build_profile = "default"
+        self.reshim = "immediate"
+        self.gc = False
+        self.gc_max_versions = None
+        self.gc_max_size = None
+        self.gc_dedupe = False
+        self.project_dir = None
+        self.tools = {}
+        self.backend = None
+        self.pythons_dir = None
+        self.fetch = False
+        self.download_cache = None
+        self.roots = []
+        self.copy_on_demand = False
 
 
 KNOWN_FLAVOURS = (
@@ -64,15 +157,144 @@ KNOWN_FLAVOURS = (
     "stackless",
 )
 
+RESOLVERS = ("auto", "fs", "cli", "batch", "daemon")
+
+#: Build variants environments can prefer for their python
+VARIANTS = ("default", "optimized", "freethreaded", "debug")
+
+#: A free-threaded build version (``3.13.0t``)
+FREETHREADED_RE = re.compile(r"^(?P<release>\d+(?:\.\d+)*)t$")
+
+#: Version managers providing pythons
+BACKENDS = ("auto", "asdf", "mise", "pyenv", "directory")
+
+#: The python-build plugin within a pyenv clone
+PYTHON_BUILD = os.path.join("plugins", "python-build")
+
+#: List installed versions then locate the first one, in a single shell
+BATCH_SCRIPT = """\
+versions=$(asdf list python 2>&1)
+code=$?
+if [ $code -ne 0 ]; then
+    echo "$versions"
+    exit $code
+fi
+echo "$versions"
+echo "{separator}"
+first=$(echo "$versions" | sed -n '1s/^[[:space:]]*//p')
+if [ -n "$first" ]; then
+    asdf where python "$first" 2>&1 || true
+fi
+"""
+BATCH_SEPARATOR = "--- tox-asdf ---"
+
+#: Collect an interpreter metadata (compatible with all supported pythons)
+INSPECT_SCRIPT = """\
+import json, os, platform, sys, sysconfig
+config = sysconfig.get_config_vars()
+print(json.dumps({
+    "executable": sys.executable,
+    "implementation": platform.python_implementation(),
+    "version_info": list(sys.version_info),
+    "extra_version_info": list(getattr(sys, "pypy_version_info", [])) or None,
+    "is_64": sys.maxsize > 2**32,
+    "sysplatform": sys.platform,
+    "os_sep": os.sep,
+    "machine": platform.machine(),
+    "abiflags": getattr(sys, "abiflags", ""),
+    "paths": sysconfig.get_paths(),
+    "build": {
+        "config_args": config.get("CONFIG_ARGS"),
+        "py_debug": bool(config.get("Py_DEBUG")),
+        "py_gil_disabled": bool(config.get("Py_GIL_DISABLED")),
+    },
+}))
+"""
+
+#: The metadata fields known by tox
+TOX_INFO_FIELDS = (
+    "implementation",
+    "version_info",
+    "sysplatform",
+    "is_64",
+    "os_sep",
+    "extra_version_info",
+)
+
+#: Marks an install in progress (or interrupted) next to its directory
+INSTALLING_MARKER = ".{}.tox-asdf-installing"
+INSTALLING_RE = re.compile(r"^\.(?P<version>.+)\.tox-asdf-installing$")
+
+#: Serializes installs of a version across processes
+INSTALL_LOCK = ".{}.tox-asdf.lock"
+
+#: How long to wait for the resolver daemon before resolving in-process
+DAEMON_TIMEOUT = 0.5
+
+#: Named sets of build settings for `asdf install` (see `build_env`)
+BUILD_PROFILES = ("default", "fast-build", "optimized")
+
+#: Configure flags making slower builds of faster pythons
+OPTIMIZATION_FLAGS = ("--enable-optimizations", "--with-lto")
+
+#: When to reshim pythons restored from artifacts
+RESHIM_MODES = ("immediate", "deferred", "never")
+
+#: Maximum concurrent resolutions at configure time
+PREFETCH_JOBS = 8
+
+#: Memory reserved for each concurrent python build
+BUILD_MEMORY = 1024**3
+
 CFG = Config()
 
 
+class RunState(object):
+    """State shared by all environments of a single tox run"""
+
+    def __init__(self):
+        self.installed = None
+        self.installs_root = None
+        self.resolved = {}
+        self.metadata = {}
+        self.installs = {}
+        self.available = None
+        self.plugin_updated = False
+        self.lock_file = None
+        self.daemon_down = False
+        self.prefetched = {}
+        self.broken = None
+        self.build_profiles = {}
+        self.variants = {}
+        self.install_jobs = 1
+        self.reshim_pending = False
+        self.used = set()
+        self.tools = None
+        self.backend = None
+        self.index_lock = threading.Lock()
+        self.timings = Timings()
+        self.lock = threading.Lock()
+
+    def invalidate(self):
+        """Forget everything known about installed versions"""
+        with self.lock:
+            self.installed = None
+            self.installs_root = None
+            self.resolved.clear()
+
+
+RUN = RunState()
+
+
 class ToxLogger:
     def __init__(self, logger):
         self.logger = logger
 
     def format(self, msg, args, kwargs):
-        return "ASDF: {}".format(str(msg).format(*args, **kwargs))
+        msg = str(msg)
+        if args or kwargs:
+            msg = msg.format(*args, **kwargs)
+        return "ASDF: {}".format(msg)
 
     def debug(self, msg, *args, **kwargs):
         if CFG.debug:
@@ -117,15 +339,203 @@ def tox_addoption(parser):
             "built-in default logic."
         ),
     )
+    group.add_argument(
+        "--asdf-resolver",
+        dest="asdf_resolver",
+        default="auto",
+        choices=RESOLVERS,
+        help=(
+            "How installed pythons are looked up: `fs` reads the asdf installs directory, "
+            "`cli` calls the `asdf` program for each lookup, `batch` calls it once for all "
+            "lookups, `daemon` asks the resolver daemon (falling back to `fs` when it is not "
+            "running) and `auto` (the default) uses the daemon if its socket exists, `fs` when "
+            "the installs directory exists and falls back to `cli` otherwise."
+        ),
+    )
+    group.add_argument(
+        "--asdf-install-jobs",
+        dest="asdf_install_jobs",
+        default=0,
+        type=int,
+        metavar="N",
+        help=(
+            "How many pythons `--asdf-install` can build concurrently. "
+            "Defaults to 0 meaning as many as CPUs and memory allow."
+        ),
+    )
+    group.add_argument(
+        "--asdf-offline",
+        dest="asdf_offline",
+        default=False,
+        action="store_true",
+        help=(
+            "Use the cached list of installable versions whatever its age "
+            "and never update the asdf python plugin."
+        ),
+    )
+    group.add_argument(
+        "--asdf-timings",
+        dest="asdf_timings",
+        default=False,
+        action="store_true",
+        help="Print a summary of the time spent in asdf interactions at the end of the run.",
+    )
+    group.add_argument(
+        "--asdf-timings-json",
+        dest="asdf_timings_json",
+        default=None,
+        metavar="FILE",
+        help="Write all timed asdf interactions as JSON into FILE.",
+    )
+    group.add_argument(
+        "--asdf-venv-templates",
+        dest="asdf_venv_templates",
+        default=False,
+        action="store_true",
+        help=(
+            "Create environments by cloning a pristine virtualenv kept for each asdf "
+            "interpreter, hardlinking its files when possible."
+        ),
+    )
+    group.add_argument(
+        "--asdf-artifacts",
+        dest="asdf_artifacts",
+        default=None,
+        metavar="DIR",
+        help=(
+            "A directory of prebuilt pythons archives: `--asdf-install` unpacks them "
+            "instead of building and stores the pythons it builds."
+        ),
+    )
+    group.add_argument(
+        "--asdf-lock",
+        dest="asdf_lock",
+        default=False,
+        action="store_true",
+        help=(
+            "Resolve the pythons of all selected environments and pin them "
+            "into the lock file (tox-asdf.lock by default)."
+        ),
+    )
+    group.add_argument(
+        "--asdf-lock-strict",
+        dest="asdf_lock_strict",
+        default=False,
+        action="store_true",
+        help="Fail instead of resolving again when a python is missing from the lock file or has changed.",
+    )
+    group.add_argument(
+        "--asdf-timeout",
+        dest="asdf_timeout",
+        default=None,
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Kill and retry asdf commands (except installs) running longer than SECONDS "
+            "(defaults to {}).".format(DEFAULT_TIMEOUT)
+        ),
+    )
+    group.add_argument(
+        "--asdf-gc",
+        dest="asdf_gc",
+        default=False,
+        action="store_true",
+        help=(
+            "At the end of the run, uninstall the least recently used pythons beyond the "
+            "`gc_max_versions` and `gc_max_size` quotas of the [asdf] section."
+        ),
+    )
+    group.add_argument(
+        "--asdf-fetch",
+        dest="asdf_fetch",
+        default=False,
+        action="store_true",
+        help=(
+            "Download the packages needed to build the pythons of all selected environments "
+            "into the download cache so later installs need no network."
+        ),
+    )
+    group.add_argument(
+        "--asdf-backend",
+        dest="asdf_backend",
+        default=None,
+        choices=BACKENDS,
+        help=(
+            "The version manager providing pythons. "
+            "`auto` (default) picks the first one having installs, without spawning anything."
+        ),
+    )
+    group.add_argument(
+        "--asdf-no-cache",
+        dest="asdf_cache",
+        default=True,
+        action="store_false",
+        help="Do not use nor update the persistent resolution cache.",
+    )
+    parser.add_testenv_attribute(
+        name="asdf_build_profile",
+        type="string",
+        default=None,
+        help="The build profile used by `--asdf-install` for this environment python.",
+    )
+    parser.add_testenv_attribute(
+        name="asdf_variant",
+        type="string",
+        default=None,
+        help=(
+            "The build variant to prefer for this environment python: "
+            "{} (never a debug build unless requested).".format(", ".join(VARIANTS))
+        ),
+    )
 
 
 @tox.hookimpl
 def tox_configure(config):
+    global RUN
+    RUN = RunState()
     CFG.verbose = config.option.verbose_level > 0
     CFG.debug = config.option.verbose_level > 1
     CFG.no_fallback = config.option.asdf_no_fallback
     CFG.install = config.option.asdf_install
+    CFG.resolver = config.option.asdf_resolver
+    CFG.cache = config.option.asdf_cache
+    CFG.install_jobs = config.option.asdf_install_jobs
+    CFG.offline = config.option.asdf_offline
+    CFG.timings = config.option.asdf_timings
+    CFG.timings_json = config.option.asdf_timings_json
+    CFG.venv_templates = config.option.asdf_venv_templates
+    CFG.artifacts = config.option.asdf_artifacts
+    CFG.lock = config.option.asdf_lock
+    CFG.lock_strict = config.option.asdf_lock_strict
+    CFG.timeout = config.option.asdf_timeout
+    CFG.gc = config.option.asdf_gc
+    CFG.backend = config.option.asdf_backend
+    CFG.fetch = config.option.asdf_fetch
+    CFG.project_dir = str(config.toxinidir)
     parse_config_versions(config._cfg.sections, CFG)
+    parse_config_options(config._cfg.sections, CFG)
+    CFG.lock_file = os.path.join(str(config.toxinidir), CFG.lock_file)
+    envconfigs = [config.envconfigs[name] for name in config.envlist]
+    parse_envs_build_profiles(envconfigs)
+    parse_envs_variants(envconfigs)
+    if CFG.tools:
+        inject_tools(envconfigs)
+    if CFG.fetch:
+        fetch_downloads(envconfigs)
+    if CFG.install and runs_environments(config.option):
+        schedule_installs(envconfigs)
+    if CFG.lock:
+        write_lock_file(envconfig.basepython for envconfig in envconfigs)
+    elif runs_environments(config.option):
+        prefetch_pythons(envconfigs)
+
+
+def runs_environments(option):
+    """Whether tox is going to run environments (and not only list or show them)"""
+    return not any(
+        getattr(option, name, False)
+        for name in ("listenvs", "listenvs_all", "showconfig", "help_ini")
+    )
 
 
 def parse_config_versions(tox_config, plugin_config):
@@ -137,23 +547,363 @@ def parse_config_versions(tox_config, plugin_config):
     plugin_config.pypy3_version = pypy3
 
 
+def parse_config_options(tox_config, plugin_config):
+    """Parse the [asdf] plugin section settings in tox.ini"""
+    config_asdf = tox_config.get("asdf", {})
+    plugin_config.cache_dir = config_asdf.get("cache_dir", plugin_config.cache_dir)
+    plugin_config.artifacts = plugin_config.artifacts or config_asdf.get("artifacts")
+    plugin_config.lock_file = config_asdf.get("lock_file", plugin_config.lock_file)
+    plugin_config.daemon_socket = config_asdf.get("daemon_socket", plugin_config.daemon_socket)
+    plugin_config.timeout = plugin_config.timeout or parse_setting(
+        config_asdf, "timeout", float, DEFAULT_TIMEOUT
+    )
+    plugin_config.install_timeout = parse_setting(
+        config_asdf, "install_timeout", float, plugin_config.install_timeout
+    )
+    plugin_config.retries = parse_setting(config_asdf, "retries", int, plugin_config.retries)
+    plugin_config.build_profile = check_choice(
+        "build_profile",
+        config_asdf.get("build_profile", plugin_config.build_profile),
+        BUILD_PROFILES,
+    )
+    plugin_config.reshim = check_choice(
+        "reshim", config_asdf.get("reshim", plugin_config.reshim), RESHIM_MODES
+    )
+    plugin_config.gc_max_versions = parse_setting(
+        config_asdf, "gc_max_versions", int, plugin_config.gc_max_versions
+    )
+    plugin_config.gc_max_size = parse_setting(
+        config_asdf, "gc_max_size", parse_size, plugin_config.gc_max_size
+    )
+    plugin_config.backend = check_choice(
+        "backend", plugin_config.backend or config_asdf.get("backend", "auto"), BACKENDS
+    )
+    plugin_config.pythons_dir = config_asdf.get("pythons_dir", plugin_config.pythons_dir)
+    if plugin_config.backend == "directory" and not plugin_config.pythons_dir:
+        raise tox.exception.ConfigError("The directory backend requires a pythons_dir setting")
+    if "download_cache" in config_asdf:
+        plugin_config.download_cache = os.path.expanduser(config_asdf["download_cache"])
+    plugin_config.roots = [
+        os.path.expanduser(root.strip())
+        for root in config_asdf.get("roots", "").splitlines()
+        if root.strip()
+    ]
+    plugin_config.copy_on_demand = config_asdf.get("copy_on_demand", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+    )
+    plugin_config.tools = parse_tools(config_asdf.get("tools", ""))
+    plugin_config.gc_dedupe = config_asdf.get("gc_dedupe", "false").lower() in ("true", "1", "yes")
+    plugin_config.list_all_ttl = parse_setting(
+        config_asdf, "list_all_ttl", int, plugin_config.list_all_ttl
+    )
+    plugin_config.plugin_update_interval = parse_setting(
+        config_asdf, "plugin_update_interval", int, plugin_config.plugin_update_interval
+    )
+
+
+def parse_envs_build_profiles(envconfigs):
+    """Collect the build profiles requested by environments for their python"""
+    collect_envs_choices(envconfigs, "asdf_build_profile", BUILD_PROFILES, RUN.build_profiles)
+
+
+def parse_envs_variants(envconfigs):
+    """
+    Collect the build variants preferred by environments for their python.
+
+    Pythons preferring optimized builds are installed with the `optimized` build profile
+    unless environments request another one.
+    """
+    collect_envs_choices(envconfigs, "asdf_variant", VARIANTS, RUN.variants)
+    for expected, variant in RUN.variants.items():
+        if variant == "optimized":
+            RUN.build_profiles.setdefault(expected, "optimized")
+
+
+def collect_envs_choices(envconfigs, attribute, choices, values):
+    """Collect an environment setting applying to its python, the first environment winning"""
+    for envconfig in envconfigs:
+        value = getattr(envconfig, attribute, None)
+        expected = expected_version(envconfig.basepython)
+        if not value or not expected:
+            continue
+        check_choice(attribute, value, choices)
+        current = values.setdefault(expected, value)
+        if current != value:
+            LOG.warning(
+                "{} requests {} {} for python {}, already using {}",
+                envconfig.envname,
+                attribute,
+                value,
+                expected,
+                current,
+            )
+
+
+def parse_setting(config_asdf, name, parse, default=None):
+    """Parse an [asdf] setting with ``parse`` if set, reporting invalid values as config errors"""
+    if name not in config_asdf:
+        return default
+    try:
+        return parse(config_asdf[name])
+    except ValueError:
+        msg = "Invalid {} value {!r}"
+        raise tox.exception.ConfigError(msg.format(name, config_asdf[name]))
+
+
+def check_choice(name, value, choices):
+    if value not in choices:
+        msg = "Invalid {} value {!r}, expected one of: {}"
+        raise tox.exception.ConfigError(msg.format(name, value, ", ".join(choices)))
+    return value
+
+
+@tox.hookimpl
+def tox_testenv_create(venv, action):
+    """Clone the environment from its interpreter template virtualenv if enabled"""
+    envconfig = venv.envconfig
+    if not CFG.venv_templates or envconfig.sitepackages or envconfig.alwayscopy:
+        return
+    python = str(venv.getsupportedinterpreter())
+    if python not in RUN.metadata:
+        # Not an asdf interpreter
+        return
+    args = ["--download" if envconfig.download else "--no-download"]
+    root = os.path.join(CFG.cache_dir or default_cache_dir(), "templates")
+    try:
+        with RUN.timings.measure("template", python=python):
+            key = template_key(python, fingerprint(python), *args)
+            template = ensure_template(root, key, python, args)
+    except (OSError, subprocess.CalledProcessError) as e:
+        LOG.warning("Unable to create a template virtualenv for {}: {}", python, e)
+        return
+    cleanup_for_venv(venv)
+    with RUN.timings.measure("clone", python=python, envname=envconfig.envname):
+        clone_template(template, str(venv.path))
+    LOG.info("Cloned {} from {}", envconfig.envname, template)
+    return True
+
+
+@tox.hookimpl
+def tox_cleanup(session):
+    if RUN.reshim_pending:
+        reshim()
+    if CFG.gc:
+        collect_garbage()
+    report_timings(RUN.timings)
+
+
+def report_timings(timings):
+    """Print and/or dump the run timings if requested"""
+    if CFG.timings:
+        for line in timings.format():
+            print("ASDF: {}".format(line))
+    if CFG.timings_json:
+        try:
+            timings.dump(CFG.timings_json)
+        except OSError as e:
+            LOG.warning("Unable to write timings to {}: {}", CFG.timings_json, e.strerror)
+
+
+def timed(operation):
+    """Record the decorated function calls duration"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with RUN.timings.measure(operation, args=[str(arg) for arg in args]):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 def _version_key(version: str) -> Version:
+    match = FREETHREADED_RE.match(version)
+    if match:
+        return Version(match.group("release"))
     if version.startswith(KNOWN_FLAVOURS):
         return Version(version.split("-", 1)[-1])
     return Version(version)
 
 
+def _sort_key(version):
+    """A total ordering key ranking unparsable versions below all others"""
+    try:
+        return (1, _version_key(version))
+    except InvalidVersion:
+        return (0, version)
+
+
+def _prefixes(version):
+    """All the prefixes of a version ending on a segment boundary"""
+    match = FREETHREADED_RE.match(version)
+    if match:
+        # Free-threaded builds only match free-threaded prefixes (`3.13t`)
+        for prefix in _prefixes(match.group("release")):
+            if prefix:
+                yield prefix + "t"
+        return
+    yield ""
+    for i, char in enumerate(version):
+        if char in ".-":
+            yield version[:i]
+    yield version
+
+
+class VersionIndex(object):
+    """
+    A precomputed lookup table of versions.
+
+    Each version is registered under all its segment-aligned prefixes
+    (``pypy3.8-7.0.0`` under ``pypy3``, ``pypy3.8``, ``pypy3.8-7``...)
+    so finding the best match for a prefix is a single dict lookup
+    and ``3.1`` never matches ``3.10.x``.
+    """
+
+    def __init__(self, versions):
+        self.versions = list(versions)
+        self._best = {}
+        for version in self.versions:
+            key = _sort_key(version)
+            for prefix in _prefixes(version):
+                current = self._best.get(prefix)
+                if current is None or key > current[0]:
+                    self._best[prefix] = (key, version)
+
+    def __iter__(self):
+        return iter(self.versions)
+
+    def __len__(self):
+        return len(self.versions)
+
+    def __contains__(self, version):
+        return version in self.versions
+
+    def best(self, prefix):
+        """Find the best (latest stable) release matching prefix"""
+        best = self._best.get(prefix)
+        return best[1] if best else None
+
+    def matching(self, prefix):
+        """All the releases matching prefix, best first"""
+        versions = [version for version in self.versions if prefix in set(_prefixes(version))]
+        return sorted(versions, key=_sort_key, reverse=True)
+
+
 def best_version(version, versions):
     """Find the best (latest stable) release matching version"""
-    compatibles = (v for v in versions if v.startswith(version))
-    sorted_compatibles = sorted(compatibles, reverse=True, key=_version_key)
-    return next(iter(sorted_compatibles), None)
+    if not isinstance(versions, VersionIndex):
+        versions = VersionIndex(versions)
+    return versions.best(version)
+
+
+def log_error(error):
+    """Log an error only once, even when raised again by later lookups"""
+    if getattr(error, "logged", False):
+        return
+    error.logged = True
+    LOG.error(error)
+
+
+def run_asdf(args, capture=True, merge_stderr=True, env=None):
+    """
+    Run ``asdf {args}``, recording its duration and exit code.
+
+    Returns the output if ``capture`` is true.
+    Installs have their own timeout and are never retried.
+    """
+    if args.startswith("install "):
+        timeout, retries = CFG.install_timeout, 0
+    else:
+        timeout, retries = CFG.timeout, CFG.retries
+    return run_shell(
+        "asdf {}".format(args),
+        capture=capture,
+        merge_stderr=merge_stderr,
+        timeout=timeout,
+        retries=retries,
+        env=env,
+    )
+
+
+def run_shell(cmd, capture=True, merge_stderr=True, timeout=None, retries=0, env=None):
+    """
+    Run a shell command calling asdf, recording its duration and exit code.
+
+    A command running longer than ``timeout`` seconds is killed and retried up to ``retries`` times.
+    Once asdf or its python plugin is found missing, no command is run anymore
+    and the same error is raised for the rest of the run.
+    """
+    if RUN.broken is not None:
+        RUN.timings.record("circuit open", command=cmd)
+        raise RUN.broken
+    attempts = retries + 1
+    for attempt in range(1, attempts + 1):
+        start = time.perf_counter()
+        returncode = 0
+        try:
+            return run_process(cmd, capture, merge_stderr, timeout, env)
+        except subprocess.TimeoutExpired:
+            returncode = None
+            LOG.warning("`{}` timed out after {}s (attempt {}/{})", cmd, timeout, attempt, attempts)
+        except subprocess.CalledProcessError as e:
+            returncode = e.returncode
+            try:
+                handle_asdf_error(e)
+            except FATAL_ERRORS as error:
+                RUN.broken = error
+                raise
+        finally:
+            RUN.timings.record(
+                "subprocess", time.perf_counter() - start, argv=cmd, returncode=returncode
+            )
+    raise AsdfTimeout("`{}` timed out after {}s", cmd, timeout)
+
+
+def run_process(cmd, capture=True, merge_stderr=True, timeout=None, env=None):
+    """
+    Run a shell command in its own session, returning its output (or exit code if not ``capture``).
+
+    On timeout its whole process group is killed, so no asdf subprocess (a build...)
+    outlives it, and `subprocess.TimeoutExpired` is raised.
+    """
+    stdout = subprocess.PIPE if capture else None
+    stderr = subprocess.STDOUT if capture and merge_stderr else None
+    with subprocess.Popen(
+        cmd,
+        shell=True,
+        stdout=stdout,
+        stderr=stderr,
+        universal_newlines=True,
+        env=env,
+        start_new_session=True,
+    ) as proc:
+        try:
+            output, _ = proc.communicate(timeout=timeout or None)
+        except subprocess.TimeoutExpired:
+            kill_process_group(proc)
+            proc.wait()
+            raise
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output)
+    return output if capture else proc.returncode
+
+
+def kill_process_group(proc):
+    """Kill a process started in its own session and all its descendants"""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (AttributeError, ProcessLookupError):  # Windows or already exited
+        proc.kill()
 
 
 def handle_asdf_error(error):
     if error.returncode == 127:
-        raise AsdfMissing("asdf is not installed")
-    elif error.returncode == 1 and error.output.startswith("No such plugin:"):
+        raise AsdfMissing("{} is not installed", command_program(error.cmd))
+    elif error.returncode == 1 and (error.output or "").startswith("No such plugin:"):
         msg = "python plugin is missing. Install it with `asdf plugin-add python`"
         raise AsdfPluginMissing(msg)
     if error.output:
@@ -163,50 +913,719 @@ def handle_asdf_error(error):
     raise AsdfError(msg, error.cmd, error.returncode, (error.output or "").strip())
 
 
+def command_program(cmd):
+    """The version manager a command calls (asdf for scripts)"""
+    program = cmd.split(None, 1)[0] if isinstance(cmd, str) and cmd.strip() else ""
+    return program if program in ("mise", "pyenv") else "asdf"
+
+
+def installed_index(list_installed):
+    """Get the installed versions index, listed once per run even by concurrent lookups"""
+    with RUN.index_lock:
+        if RUN.installed is None:
+            RUN.installed = VersionIndex(list_installed())
+        return RUN.installed
+
+
+@timed("get_installed (cli)")
 def asdf_get_installed(version):
     """Get the best matching installed version"""
+    return best_version(version, installed_index(asdf_list_installed))
+
+
+def asdf_list_installed():
+    """List installed versions"""
+    output = run_asdf("list python")
+    return without_incomplete(parse_versions(output))
+
+
+def without_incomplete(versions):
+    """Filter out versions being installed or whose install has been interrupted"""
     try:
-        output = subprocess.check_output(
-            "asdf list python", shell=True, stderr=subprocess.STDOUT, universal_newlines=True
-        )
-    except subprocess.CalledProcessError as e:
-        handle_asdf_error(e)
+        names = os.listdir(asdf_python_installs())
+    except OSError:
+        return versions
+    incomplete = {m.group("version") for m in map(INSTALLING_RE.match, names) if m}
+    return [version for version in versions if version not in incomplete]
+
 
-    versions = (s.strip() for s in output.splitlines())
-    return best_version(version, versions)
+def parse_versions(output):
+    """Parse asdf versions listing"""
+    return [s.strip() for s in output.splitlines() if s.strip()]
 
 
+@timed("get_installed (batch)")
+def batch_get_installed(version):
+    """Get the best matching installed version, listing and locating installs in one shell"""
+    return best_version(version, installed_index(batch_list_installed))
+
+
+def batch_list_installed():
+    """
+    List installed versions and find their root directory with a single subprocess.
+
+    The root is deduced from the `asdf where` output of the first version
+    and stored in the run state so `batch_which` does not need asdf anymore.
+    """
+    output = run_shell(
+        BATCH_SCRIPT.format(separator=BATCH_SEPARATOR), timeout=CFG.timeout, retries=CFG.retries
+    )
+    listing, _, where = output.partition(BATCH_SEPARATOR)
+    versions = parse_versions(listing)
+    home = where.strip()
+    if versions and os.path.basename(home) == versions[0]:
+        RUN.installs_root = os.path.dirname(home)
+    return without_incomplete(versions)
+
+
+@timed("which (batch)")
+def batch_which(version):
+    """Get the python binary path for a given installed version from the batch listing"""
+    if RUN.installs_root is None:
+        return asdf_which(version)
+    return os.path.join(RUN.installs_root, version, "bin", "python")
+
+
+def asdf_list_all():
+    """List all versions available for install"""
+    output = run_asdf("list-all python", merge_stderr=False)
+    return [s.strip() for s in output.splitlines() if s.strip()]
+
+
+def asdf_plugin_update():
+    """Update the asdf python plugin (and so its known versions)"""
+    run_asdf("plugin update python")
+
+
+@timed("available_versions")
+def available_versions(refresh=False):
+    """List versions available for install, cached for ``list_all_ttl`` seconds"""
+    if RUN.available is not None and not refresh:
+        return RUN.available
+    backend = get_backend()
+    cache = get_cache(AvailableVersionsCache)
+    data_dir = backend.root
+    versions = None
+    if cache and not refresh:
+        versions = cache.get(data_dir, None if CFG.offline else CFG.list_all_ttl)
+        RUN.timings.record("list-all cache " + ("miss" if versions is None else "hit"))
+    if versions is None:
+        versions = backend.list_all()
+        if cache:
+            cache.set(data_dir, versions)
+    RUN.available = VersionIndex(versions)
+    return RUN.available
+
+
+def refresh_available_versions():
+    """
+    Update the python plugin and list available versions again.
+
+    The plugin is updated at most once per ``plugin_update_interval`` seconds
+    and never in offline mode. Returns ``None`` if nothing has been refreshed.
+    """
+    if CFG.offline or RUN.plugin_updated:
+        return
+    RUN.plugin_updated = True
+    backend = get_backend()
+    if not backend.updatable:
+        return
+    cache = get_cache(AvailableVersionsCache)
+    data_dir = backend.root
+    if cache:
+        if cache.plugin_updated_within(data_dir, CFG.plugin_update_interval):
+            return
+        cache.mark_plugin_updated(data_dir)
+    LOG.info("Updating the {} python plugin", backend.name)
+    try:
+        backend.update()
+    except AsdfError as e:
+        LOG.warning(e)
+        return
+    return available_versions(refresh=True)
+
+
+@timed("install")
 def asdf_install(version):
     """Install the best matching version"""
+    backend = get_backend()
+    if not backend.installable:
+        LOG.warning("The {} backend cannot install python {}", backend.name, version)
+        return None
+    expected = version
+    version = best_version(expected, available_versions())
+    if version is None:
+        versions = refresh_available_versions()
+        if versions:
+            version = best_version(expected, versions)
+    return asdf_install_version(version)
+
+
+def asdf_install_version(version, profile=None):
+    """
+    Install an exact version with a build profile, unpacking a prebuilt one if available.
+
+    Only one process installs a given version at a time:
+    the others wait for it and reuse its install.
+    An install is marked as incomplete until it succeeds
+    so an interrupted one is never used and gets cleaned up on next install.
+    """
+    backend = get_backend()
+    if version is None:
+        # Nothing to coordinate, let the version manager report the error
+        backend.install(version)
+        return version
+    installs = backend.installs
+    with install_lock(installs, version):
+        marker = os.path.join(installs, INSTALLING_MARKER.format(version))
+        home = os.path.join(installs, version)
+        if is_installed(installs, version):
+            LOG.info("python {} has been installed by another process", version)
+        else:
+            if os.path.exists(marker) or os.path.exists(home):
+                LOG.warning("Removing incomplete python {} install", version)
+                shutil.rmtree(home, ignore_errors=True)
+            open(marker, "w").close()
+            env = download_env(build_env(profile or version_build_profile(version)))
+            if not restore_artifact(version, env):
+                backend.install(version, env)
+                store_artifact(version, env)
+            os.remove(marker)
+    RUN.invalidate()
+    return version
+
+
+def version_build_profile(version):
+    """Get the build profile requested by environments for an exact version"""
+    prefixes = set(_prefixes(version))
+    for expected, profile in RUN.build_profiles.items():
+        if expected in prefixes:
+            return profile
+    return CFG.build_profile
+
+
+def build_env(profile):
+    """
+    Get the environment to build pythons with for a build profile.
+
+    ``default`` uses the ambient environment (returns `None`),
+    ``fast-build`` builds in parallel without optimizations nor test modules
+    and ``optimized`` builds in parallel with PGO and LTO.
+    """
+    if profile == "default":
+        return None
+    env = dict(os.environ)
+    options = env.get("PYTHON_CONFIGURE_OPTS", "").split()
+    options = [option for option in options if option not in OPTIMIZATION_FLAGS]
+    if profile == "optimized":
+        options.extend(OPTIMIZATION_FLAGS)
+    elif "--disable-test-modules" not in options:
+        options.append("--disable-test-modules")
+    env["PYTHON_CONFIGURE_OPTS"] = " ".join(options)
+    # Concurrent installs share the CPUs
+    env["MAKE_OPTS"] = "-j{}".format(max(1, (os.cpu_count() or 1) // RUN.install_jobs))
+    return env
+
+
+def get_download_cache():
+    """Get the python-build packages download cache"""
+    root = CFG.download_cache or os.path.join(CFG.cache_dir or default_cache_dir(), "downloads")
+    return DownloadCache(root)
+
+
+def download_env(env=None):
+    """
+    Make python-build use the download cache as its mirror, if it exists.
+
+    A mirror already configured in the environment is left untouched.
+    """
+    cache = get_download_cache()
+    if not os.path.isdir(cache.root) or "PYTHON_BUILD_MIRROR_URL" in os.environ:
+        return env
+    env = dict(os.environ) if env is None else env
+    env["PYTHON_BUILD_MIRROR_URL"] = cache.mirror_url()
+    return env
+
+
+@timed("fetch")
+def fetch_downloads(envconfigs):
+    """Download the packages needed to build every environment python into the download cache"""
+    backend = get_backend()
+    definitions = backend.build_definitions
+    if not definitions:
+        LOG.warning("The {} backend does not build pythons, nothing to fetch", backend.name)
+        return
     try:
-        output = subprocess.check_output(
-            "asdf list-all python", shell=True, universal_newlines=True
-        )
-    except subprocess.CalledProcessError as e:
-        handle_asdf_error(e)
+        available = available_versions()
+    except AsdfError as e:
+        log_error(e)
+        return
+    versions = set()
+    for envconfig in envconfigs:
+        expected = expected_version(envconfig.basepython)
+        if expected:
+            version = best_version(expected, available)
+            if version is None:
+                LOG.warning("No python matching {} to fetch", expected)
+            else:
+                versions.add(version)
+    cache = get_download_cache()
+    for version in sorted(versions):
+        try:
+            packages = build_packages(os.path.join(definitions, version))
+        except OSError as e:
+            LOG.warning("Unable to read python {} build definition: {}", version, e)
+            continue
+        for name, url, checksum in packages:
+            try:
+                if cache.fetch(url, checksum, timeout=CFG.timeout):
+                    LOG.info("Downloaded {} into {}", name, cache.root)
+            except (OSError, ChecksumMismatch) as e:
+                LOG.warning("Unable to download {}: {}", url, e)
+
+
+def is_installed(installs, version):
+    """Whether a version is fully installed"""
+    if os.path.exists(os.path.join(installs, INSTALLING_MARKER.format(version))):
+        return False
+    return os.access(os.path.join(installs, version, "bin", "python"), os.X_OK)
 
-    versions = (s.strip() for s in output.splitlines())
-    version = best_version(version, versions)
 
+@contextmanager
+def install_lock(installs, version):
+    """Hold an exclusive inter-process lock on a version install"""
+    os.makedirs(installs, exist_ok=True)
+    with open(os.path.join(installs, INSTALL_LOCK.format(version)), "a") as f:
+        if fcntl is None:  # pragma: no cover
+            yield
+            return
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            LOG.info("Waiting for another process installing python {}", version)
+            with RUN.timings.measure("install lock wait", version=version):
+                fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def get_artifact_store():
+    """Get the prebuilt pythons store if configured"""
+    return ArtifactStore(CFG.artifacts) if CFG.artifacts else None
+
+
+@timed("restore artifact")
+def restore_artifact(version, env=None):
+    """Unpack a prebuilt version from the artifacts store and reshim"""
+    store = get_artifact_store()
+    if not store:
+        return False
+    backend = get_backend()
+    dest = os.path.join(backend.installs, version)
+    name = artifact_name(version, build_options(dest, env))
     try:
-        subprocess.check_call("asdf install python {}".format(version), shell=True)
-    except subprocess.CalledProcessError as e:
-        handle_asdf_error(e)
-    return version
+        if not store.restore(name, dest):
+            return False
+    except (ChecksumMismatch, OSError, tarfile.TarError) as e:
+        LOG.warning("Unable to restore python {} from {}: {}", version, store.root, e)
+        return False
+    LOG.info("Restored python {} from {}", version, store.path(name))
+    schedule_reshim(version)
+    return True
+
+
+def schedule_reshim(version):
+    """Reshim a python installed without asdf as configured by `reshim`"""
+    if not get_backend().shims:
+        return
+    if CFG.reshim == "immediate":
+        reshim(version)
+    elif CFG.reshim == "deferred":
+        RUN.reshim_pending = True
+
+
+def reshim(version=None):
+    """Create the asdf shims of a python version, or of all of them"""
+    try:
+        run_asdf("reshim python {}".format(version) if version else "reshim python")
+    except AsdfError as e:
+        LOG.warning(e)
+
+
+@timed("copy")
+def copy_install(root, version):
+    """
+    Copy an install from another root into the local installs.
+
+    Coordinated with installs: only one process copies a version
+    and an interrupted copy is never used.
+    """
+    installs = get_backend().installs
+    with install_lock(installs, version):
+        if is_installed(installs, version):
+            return
+        marker = os.path.join(installs, INSTALLING_MARKER.format(version))
+        home = os.path.join(installs, version)
+        shutil.rmtree(home, ignore_errors=True)
+        open(marker, "w").close()
+        try:
+            shutil.copytree(os.path.join(root, version), home, symlinks=True)
+        except (OSError, shutil.Error):
+            shutil.rmtree(home, ignore_errors=True)
+            raise
+        finally:
+            os.remove(marker)
+    LOG.info("Copied python {} from {}", version, root)
+    schedule_reshim(version)
+
+
+@timed("store artifact")
+def store_artifact(version, env=None):
+    """Pack a freshly built version into the artifacts store"""
+    store = get_artifact_store()
+    source = os.path.join(get_backend().installs, version)
+    if not store or not os.path.isdir(source):
+        return
+    name = artifact_name(version, build_options(source, env))
+    if store.has(name):
+        return
+    try:
+        store.save(name, source)
+    except (OSError, tarfile.TarError) as e:
+        LOG.warning("Unable to store python {} into {}: {}", version, store.root, e)
+    else:
+        LOG.info("Stored python {} as {}", version, store.path(name))
 
 
+def install_jobs():
+    """How many versions can be installed concurrently"""
+    if CFG.install_jobs > 0:
+        return CFG.install_jobs
+    cpus = os.cpu_count() or 1
+    try:
+        memory = os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return cpus
+    return max(1, min(cpus, memory // BUILD_MEMORY))
+
+
+def prefetch_pythons(envconfigs):
+    """
+    Start resolving every environment python in the background.
+
+    tox continues its setup meanwhile and `tox_get_python_executable`
+    only collects the results.
+    """
+    basepythons = sorted(
+        {envconfig.basepython for envconfig in envconfigs if expected_version(envconfig.basepython)}
+    )
+    if not basepythons:
+        return
+    jobs = min(len(basepythons), PREFETCH_JOBS)
+    executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="asdf-prefetch")
+    for basepython in basepythons:
+        RUN.prefetched[basepython] = executor.submit(get_python_executable, basepython)
+    executor.shutdown(wait=False)
+
+
+def schedule_installs(envconfigs):
+    """
+    Start installing every missing version in the background.
+
+    Installs are submitted in envlist order to a bounded pool
+    so the first environments get their interpreter first.
+    """
+    get_installed, _ = get_backend().resolver()
+    missing = {}
+    try:
+        for envconfig in envconfigs:
+            expected = expected_version(envconfig.basepython)
+            variant = RUN.variants.get(expected)
+            if not expected or expected in missing or variant == "debug":
+                continue
+            if variant:
+                installed = get_installed_variant(expected, variant)
+            else:
+                installed = get_installed(expected)
+            if installed is None:
+                missing[expected] = variant_prefix(expected, variant)
+        if not missing:
+            return
+        available = available_versions()
+        if any(best_version(prefix, available) is None for prefix in missing.values()):
+            available = refresh_available_versions() or available
+    except AsdfError as e:
+        log_error(e)
+        return
+
+    targets = {}
+    for expected, prefix in missing.items():
+        version = best_version(prefix, available)
+        if version is not None:
+            targets.setdefault(version, []).append(expected)
+    if not targets:
+        return
+
+    jobs = RUN.install_jobs = min(install_jobs(), len(targets))
+    LOG.info("Installing {} with {} jobs", ", ".join(targets), jobs)
+    executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="asdf-install")
+    for version, expecteds in targets.items():
+        future = executor.submit(asdf_install_version, version)
+        for expected in expecteds:
+            RUN.installs[expected] = future
+    executor.shutdown(wait=False)
+
+
+@timed("which (cli)")
 def asdf_which(version):
     """Get the python binary path for a given installed version"""
-    try:
-        cmd = "asdf where python {}".format(version)
-        python_home = subprocess.check_output(
-            cmd, shell=True, stderr=subprocess.STDOUT, universal_newlines=True
-        ).strip()
-    except subprocess.CalledProcessError as e:
-        handle_asdf_error(e)
+    python_home = run_asdf("where python {}".format(version)).strip()
     return os.path.join(python_home, "bin", "python")
 
 
+def asdf_data_dir():
+    """Get the asdf data directory, following asdf own lookup rules"""
+    data_dir = os.environ.get("ASDF_DATA_DIR")
+    if data_dir:
+        return data_dir
+    home_dir = os.path.join(os.path.expanduser("~"), ".asdf")
+    asdf_dir = os.environ.get("ASDF_DIR")
+    if asdf_dir and not os.path.isdir(home_dir):
+        return asdf_dir
+    return home_dir
+
+
+def asdf_python_installs():
+    """Get the directory holding asdf python installs"""
+    return os.path.join(asdf_data_dir(), "installs", "python")
+
+
+def tool_version_spec(tool, spec=None):
+    """The version of a tool to use, following asdf precedence when not configured"""
+    if spec:
+        return spec
+    if os.environ.get(version_env_var(tool)):
+        return os.environ[version_env_var(tool)]
+    versions = read_tool_versions(CFG.project_dir or os.getcwd()).get(tool)
+    return versions[0] if versions else None
+
+
+def tool_bin_paths(tool, home, version):
+    """
+    Get the executables directories of a tool install.
+
+    Ask the asdf plugin `list-bin-paths` script if it has one, default to `bin`.
+    """
+    script = os.path.join(asdf_data_dir(), "plugins", tool, "bin", "list-bin-paths")
+    paths = ["bin"]
+    if os.access(script, os.X_OK):
+        env = dict(
+            os.environ,
+            ASDF_INSTALL_TYPE="version",
+            ASDF_INSTALL_VERSION=version,
+            ASDF_INSTALL_PATH=home,
+        )
+        # A plugin script failing is this tool failure, not asdf missing (see `run_shell`)
+        start = time.perf_counter()
+        returncode = 0
+        try:
+            output = subprocess.check_output(
+                [script], universal_newlines=True, timeout=CFG.timeout or None, env=env
+            )
+        except subprocess.CalledProcessError as e:
+            returncode = e.returncode
+            raise AsdfError("{} list-bin-paths failed with code {}", tool, e.returncode)
+        except (subprocess.TimeoutExpired, OSError) as e:
+            returncode = None
+            raise AsdfError("{} list-bin-paths failed: {}", tool, e)
+        finally:
+            RUN.timings.record(
+                "subprocess", time.perf_counter() - start, argv=script, returncode=returncode
+            )
+        paths = output.split() or paths
+    paths = [os.path.join(home, path) for path in paths]
+    return [path for path in paths if os.path.isdir(path)]
+
+
+@timed("resolve tool")
+def resolve_tool(tool, spec=None):
+    """
+    Resolve an asdf managed tool to its ``(version, bin directories)``, without asdf nor its shims.
+
+    Returns `None` if the tool should be left to the shims (no version or `system`).
+    """
+    spec = tool_version_spec(tool, spec)
+    if not spec or spec == "system":
+        return None
+    installs = os.path.join(asdf_data_dir(), "installs", tool)
+    version = best_version(spec, fs_list_installed(installs))
+    if not version:
+        raise AsdfError("No {} install matching {} in {}", tool, spec, installs)
+    return version, tool_bin_paths(tool, os.path.join(installs, version), version)
+
+
+def resolve_tools():
+    """Resolve the configured tools once per run"""
+    if RUN.tools is None:
+        RUN.tools = {}
+        for tool, spec in CFG.tools.items():
+            try:
+                resolved = resolve_tool(tool, spec)
+            except AsdfError as e:
+                LOG.warning("{}: falling back on asdf shims", e)
+                continue
+            if resolved is None:
+                LOG.debug("No {} version to inject, falling back on asdf shims", tool)
+                continue
+            RUN.tools[tool] = resolved
+    return RUN.tools
+
+
+def inject_tools(envconfigs):
+    """Prepend the configured tools executables directories to the environments PATH"""
+    tools = resolve_tools()
+    if not tools:
+        return
+    paths = [path for _, bin_paths in tools.values() for path in bin_paths]
+    for envconfig in envconfigs:
+        path = envconfig.setenv.get("PATH") or os.environ.get("PATH", "")
+        envconfig.setenv["PATH"] = os.pathsep.join(paths + [path])
+        for tool, (version, _) in tools.items():
+            envconfig.setenv[version_env_var(tool)] = version
+
+
+@timed("get_installed (fs)")
+def fs_get_installed(version):
+    """Get the best matching installed version without calling asdf"""
+    return best_version(version, installed_index(fs_list_installed))
+
+
+def fs_list_installed(installs=None):
+    """List installed versions without calling asdf"""
+    installs = installs or asdf_python_installs()
+    versions, incomplete = [], set()
+    try:
+        with os.scandir(installs) as entries:
+            for entry in entries:
+                match = INSTALLING_RE.match(entry.name)
+                if match:
+                    incomplete.add(match.group("version"))
+                elif entry.is_dir():
+                    versions.append(entry.name)
+    except OSError as e:
+        raise AsdfError("Unable to read asdf installs from {}: {}", installs, e.strerror)
+    return [version for version in versions if version not in incomplete]
+
+
+@timed("which (fs)")
+def fs_which(version):
+    """Get the python binary path for a given installed version without calling asdf"""
+    python = os.path.join(asdf_python_installs(), version, "bin", "python")
+    if not os.access(python, os.X_OK):
+        raise AsdfError("No python executable found for version {}", version)
+    return python
+
+
+def daemon_socket():
+    """Get the resolver daemon socket path"""
+    if CFG.daemon_socket:
+        return CFG.daemon_socket
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or CFG.cache_dir or default_cache_dir()
+    return os.path.join(runtime_dir, "tox-asdf.sock")
+
+
+def daemon_query(**request):
+    """
+    Send a request to the resolver daemon.
+
+    Return `None` if the daemon is not reachable,
+    in which case it is not queried again for this run.
+    """
+    if RUN.daemon_down or not hasattr(socket, "AF_UNIX"):
+        return None
+    path = daemon_socket()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(DAEMON_TIMEOUT)
+            sock.connect(path)
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as f:
+                response = json.loads(f.readline())
+    except (OSError, ValueError) as e:
+        LOG.debug("Resolver daemon unavailable on {}: {}", path, e)
+        RUN.daemon_down = True
+        return None
+    if "error" in response:
+        raise AsdfError("{}", response["error"])
+    return response
+
+
+@timed("get_installed (daemon)")
+def daemon_get_installed(version):
+    """Get the best matching installed version from the resolver daemon"""
+    response = daemon_query(installs=asdf_python_installs(), version=version)
+    if response is None:
+        return fs_get_installed(version)
+    return response["version"]
+
+
+def get_resolver():
+    """Get the ``(get_installed, which)`` pair for the configured resolver"""
+    resolver = CFG.resolver
+    if resolver == "auto":
+        if not os.path.isdir(asdf_python_installs()):
+            resolver = "cli"
+        elif hasattr(socket, "AF_UNIX") and os.path.exists(daemon_socket()):
+            resolver = "daemon"
+        else:
+            resolver = "fs"
+    if resolver == "fs":
+        return fs_get_installed, fs_which
+    if resolver == "daemon":
+        return daemon_get_installed, fs_which
+    if resolver == "batch":
+        return batch_get_installed, batch_which
+    return asdf_get_installed, asdf_which
+
+
+def get_backend():
+    """Get the version manager providing pythons, selected once per run"""
+    with RUN.lock:
+        if RUN.backend is None:
+            backend = backends.select_backend(CFG.backend or "auto", CFG.pythons_dir)
+            LOG.debug("Using the {} backend", backend.name)
+            if CFG.roots:
+                backend = backends.TieredBackend(backend, CFG.roots, CFG.copy_on_demand)
+            RUN.backend = backend
+        return RUN.backend
+
+
+_CACHES: dict = {}
+
+
+def get_cache(cls):
+    """Get a persistent cache instance if caching is enabled"""
+    if not CFG.cache:
+        return None
+    cache_dir = CFG.cache_dir or default_cache_dir()
+    cache = _CACHES.get(cls)
+    if cache is None or cache.cache_dir != cache_dir:
+        cache = _CACHES[cls] = cls(cache_dir)
+    return cache
+
+
+def expected_version(basepython):
+    """Get the asdf version prefix matching a tox basepython"""
+    if basepython.startswith("python"):
+        return basepython.replace("python", "", 1)
+    elif basepython == "pypy":
+        return CFG.pypy2_version
+    elif basepython == "pypy3":
+        return CFG.pypy3_version
+
+
 @tox.hookimpl
 def tox_get_python_executable(envconfig):
     """
@@ -218,42 +1637,350 @@ def tox_get_python_executable(envconfig):
     per-testenv configuration, notably the ``.envname`` and ``.basepython``
     setting.
     """
-    if envconfig.basepython.startswith("python"):
-        expected = envconfig.basepython.replace("python", "", 1)
-    elif envconfig.basepython == "pypy":
-        expected = CFG.pypy2_version
-    elif envconfig.basepython == "pypy3":
-        expected = CFG.pypy3_version
+    future = RUN.prefetched.get(envconfig.basepython)
+    python = future.result() if future else get_python_executable(envconfig.basepython)
+    if python:
+        share_interpreter_info(envconfig, python)
+        record_usage(python)
+    return python
+
+
+def get_python_executable(basepython):
+    """Get the asdf python executable for a tox basepython"""
+    expected = expected_version(basepython)
+    if expected is None:
+        return
+
+    if expected in RUN.resolved:
+        RUN.timings.record("run cache hit", version=expected)
+        python = RUN.resolved[expected]
+        if python is None and CFG.no_fallback:
+            raise AsdfError("No candidate version found")
+        return python
+
+    python = locked_python(basepython)
+    if python:
+        RUN.resolved[expected] = python
+        return python
+
+    cache = get_cache(ResolutionCache)
+    installs = get_backend().search_path
+    variant = RUN.variants.get(expected)
+    key = "{}#{}".format(expected, variant) if variant else expected
+    python = None
+    if cache:
+        python = cache.get(installs, key)
+        RUN.timings.record("disk cache " + ("hit" if python else "miss"), version=expected)
+        if python:
+            LOG.info("Using {} (cached)", python)
+            RUN.resolved[expected] = python
+
+    if not python:
+        python = resolve_python(expected)
+        if python and cache:
+            cache.set(installs, key, python)
+
+    if python:
+        try:
+            info = inspect_python(python)
+        except AsdfError as e:
+            log_error(e)
+            RUN.resolved[expected] = None
+            if CFG.no_fallback:
+                raise
+            return
+        if "debug" in build_traits(info) and variant != "debug":
+            LOG.warning("{} is a debug build, set asdf_variant to prefer another one", python)
+    return python
+
+
+def get_lock_file():
+    """Get the lock file to resolve from, if any"""
+    if CFG.lock or not CFG.lock_file:
+        # Being (re)generated
+        return None
+    if RUN.lock_file is None:
+        RUN.lock_file = LockFile(CFG.lock_file)
+    if not RUN.lock_file.exists():
+        if CFG.lock_strict:
+            raise AsdfError("Lock file {} not found, generate it with --asdf-lock", CFG.lock_file)
+        return None
+    return RUN.lock_file
+
+
+def locked_python(basepython):
+    """
+    Get the interpreter pinned for ``basepython`` by the lock file.
+
+    Return `None` if it is not locked or has changed,
+    unless in strict mode where this is an error.
+    """
+    lock = get_lock_file()
+    if lock is None:
+        return None
+    entry = lock.get(basepython)
+    if entry is None:
+        if CFG.lock_strict:
+            raise AsdfError("{} is not locked in {}", basepython, lock.path)
+        return None
+    if not lock.is_valid(entry):
+        RUN.timings.record("lock stale", basepython=basepython)
+        if CFG.lock_strict:
+            raise AsdfError("Locked {} for {} has changed", entry["python"], basepython)
+        LOG.warning("Locked {} for {} has changed, resolving again", entry["python"], basepython)
+        return None
+    RUN.timings.record("lock hit", basepython=basepython)
+    LOG.info("Using {} (locked)", entry["python"])
+    if entry.get("info"):
+        RUN.metadata[entry["python"]] = entry["info"]
+    return entry["python"]
+
+
+def python_version(python):
+    """Get the asdf version of an interpreter from its ``<installs>/<version>/bin/python`` path"""
+    return os.path.basename(os.path.dirname(os.path.dirname(python)))
+
+
+def record_usage(python):
+    """Remember when an asdf python has been used, once per run"""
+    installs = asdf_python_installs()
+    home = os.path.dirname(os.path.dirname(python))
+    version = os.path.basename(home)
+    if os.path.dirname(home) != installs or version in RUN.used:
+        return
+    RUN.used.add(version)
+    usage = get_cache(UsageCache)
+    if usage:
+        usage.touch(installs, version)
+
+
+def protected_versions():
+    """Versions never garbage collected: pinned by `.tool-versions`, the lock file or in use"""
+    protected = set(RUN.used)
+    protected.update(tool_versions_pins(CFG.project_dir or os.getcwd()))
+    if os.environ.get("ASDF_PYTHON_VERSION"):
+        protected.add(os.environ["ASDF_PYTHON_VERSION"])
+    if CFG.lock_file:
+        lock = LockFile(CFG.lock_file)
+        protected.update(entry["version"] for entry in lock.pythons.values())
+    return protected
+
+
+@timed("gc")
+def collect_garbage():
+    """Uninstall the least recently used pythons beyond the quotas and dedupe the others"""
+    installs = asdf_python_installs()
+    try:
+        versions = fs_list_installed(installs)
+    except AsdfError as e:
+        LOG.warning(e)
+        return
+    usage = get_cache(UsageCache)
+    known = usage.last_used(installs) if usage else {}
+    last_used = {version: known.get(version) for version in versions}
+    sizes = {}
+    if CFG.gc_max_size is not None:
+        sizes = {version: disk_usage(os.path.join(installs, version)) for version in versions}
+    evictions = select_evictions(
+        last_used,
+        sizes,
+        protected=protected_versions(),
+        max_versions=CFG.gc_max_versions,
+        max_size=CFG.gc_max_size,
+    )
+    removed = []
+    for version in evictions:
+        LOG.info("Uninstalling least recently used python {}", version)
+        try:
+            with install_lock(installs, version):
+                run_asdf("uninstall python {}".format(version))
+        except AsdfError as e:
+            LOG.warning(e)
+        else:
+            removed.append(version)
+    if removed:
+        RUN.invalidate()
+        if usage:
+            usage.forget(installs, removed)
+    if CFG.gc_dedupe:
+        kept = [os.path.join(installs, version) for version in versions if version not in removed]
+        saved = dedupe(kept)
+        LOG.info("Saved {} MiB by hardlinking identical files", saved // 1024**2)
+
+
+def write_lock_file(basepythons):
+    """Resolve ``basepythons`` and pin them into the lock file"""
+    lock = LockFile(CFG.lock_file)
+    for basepython in sorted(set(basepythons)):
+        if expected_version(basepython) is None:
+            continue
+        python = get_python_executable(basepython)
+        if python:
+            lock.set(basepython, python_version(python), python, RUN.metadata.get(python))
+    try:
+        lock.write()
+    except OSError as e:
+        LOG.error("Unable to write lock file {}: {}", lock.path, e)
     else:
+        LOG.info("Locked {} pythons into {}", len(lock.pythons), lock.path)
+
+
+@timed("inspect")
+def inspect_python(python):
+    """
+    Get an interpreter metadata, running it only if unknown or modified.
+
+    Raise an `AsdfError` if the interpreter is not runnable.
+    """
+    info = RUN.metadata.get(python)
+    if info is not None:
+        return info
+    cache = get_cache(InterpreterInfoCache)
+    info = cache.get(python) if cache else None
+    RUN.timings.record("inspect cache " + ("miss" if info is None else "hit"), python=python)
+    if info is None:
+        start = time.perf_counter()
+        returncode = 0
+        try:
+            output = subprocess.check_output(
+                [python, "-c", INSPECT_SCRIPT],
+                stderr=subprocess.STDOUT,
+                universal_newlines=True,
+                timeout=CFG.timeout or None,
+            )
+            info = json.loads(output)
+        except subprocess.TimeoutExpired:
+            returncode = None
+            raise AsdfError("{} did not answer in {}s", python, CFG.timeout)
+        except subprocess.CalledProcessError as e:
+            returncode = e.returncode
+            msg = "{} is not a runnable python (exit code {}): {}"
+            raise AsdfError(msg, python, e.returncode, (e.output or "").strip())
+        except OSError as e:
+            returncode = None
+            raise AsdfError("{} is not a runnable python: {}", python, e.strerror)
+        except ValueError:
+            raise AsdfError("{} returned unexpected metadata: {}", python, output.strip())
+        finally:
+            RUN.timings.record(
+                "subprocess", time.perf_counter() - start, argv=python, returncode=returncode
+            )
+        if cache:
+            cache.set(python, info)
+    RUN.metadata[python] = info
+    return info
+
+
+def build_traits(info):
+    """The build variants of an interpreter (`debug`, `freethreaded`, `optimized`) from its metadata"""
+    build = info.get("build") or {}
+    traits = set()
+    if build.get("py_debug"):
+        traits.add("debug")
+    if build.get("py_gil_disabled"):
+        traits.add("freethreaded")
+    try:
+        config_args = shlex.split(build.get("config_args") or "")
+    except ValueError:
+        config_args = []
+    if any(flag in config_args for flag in OPTIMIZATION_FLAGS):
+        traits.add("optimized")
+    return traits
+
+
+def variant_prefix(expected, variant):
+    """The version prefix to look for a variant (free-threaded builds are named `3.13.0t`)"""
+    if variant == "freethreaded" and not FREETHREADED_RE.match(expected):
+        return expected + "t"
+    return expected
+
+
+@timed("get_installed (variant)")
+def get_installed_variant(expected, variant):
+    """
+    Get the best installed version of a build variant, reading the candidates build metadata.
+
+    Debug builds are only picked for the `debug` variant.
+    Without an optimized build, the best other one is used with a warning.
+    """
+    backend = get_backend()
+    _, which = backend.resolver()
+    if isinstance(backend, backends.TieredBackend):
+        # Candidates are inspected in their root, only the picked one is copied
+        which = backend.locate
+    prefix = variant_prefix(expected, variant)
+    freethreaded = FREETHREADED_RE.match(prefix) is not None
+    fallback = None
+    for version in installed_index(backend.list_installed).matching(prefix):
+        try:
+            traits = build_traits(inspect_python(which(version)))
+        except AsdfError as e:
+            LOG.warning(e)
+            continue
+        if ("debug" in traits) != (variant == "debug"):
+            continue
+        if ("freethreaded" in traits) != freethreaded:
+            continue
+        if variant != "optimized" or "optimized" in traits:
+            return version
+        fallback = fallback or version
+    if fallback:
+        LOG.warning("No optimized build of python {} installed, using {}", expected, fallback)
+    return fallback
+
+
+def share_interpreter_info(envconfig, python):
+    """Give tox the interpreter metadata so it does not run it again"""
+    info = RUN.metadata.get(python)
+    interpreters = getattr(getattr(envconfig, "config", None), "interpreters", None)
+    if info is None or interpreters is None:
         return
+    fields = {field: info[field] for field in TOX_INFO_FIELDS}
+    fields["version_info"] = tuple(fields["version_info"])
+    if fields["extra_version_info"] is not None:
+        fields["extra_version_info"] = tuple(fields["extra_version_info"])
+    interpreters.executable2info.setdefault(python, InterpreterInfo(executable=python, **fields))
+
+
+def resolve_python(expected):
+    """Resolve the python executable for an expected version"""
+    get_installed, which = get_backend().resolver()
+    variant = RUN.variants.get(expected)
 
     try:
-        version = asdf_get_installed(expected)
+        if variant:
+            version = get_installed_variant(expected, variant)
+        else:
+            version = get_installed(expected)
     except AsdfError as e:
-        LOG.error(e)
+        log_error(e)
         if CFG.no_fallback:
             raise
         return
 
     if version is None:
-        if not CFG.install:
+        if not CFG.install or variant == "debug":
+            RUN.resolved[expected] = None
             if CFG.no_fallback:
                 raise AsdfError("No candidate version found")
             return
-        version = asdf_install(expected)
+        future = RUN.installs.get(expected)
+        version = future.result() if future else asdf_install(variant_prefix(expected, variant))
 
     if version is None:
+        RUN.resolved[expected] = None
         if CFG.no_fallback:
             raise AsdfError("No candidate version to install found")
         return
 
     try:
-        python = asdf_which(version)
+        python = which(version)
     except AsdfError as e:
-        LOG.error(e)
+        log_error(e)
         if CFG.no_fallback:
             raise
         return
     else:
         LOG.info("Using {}", python)
+    RUN.resolved[expected] = python
     return python
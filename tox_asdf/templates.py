@@ -0,0 +1,113 @@
+"""Pristine virtualenvs cloned into tox environments"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+MARKER = ".tox-asdf-template"
+
+#: Directories containing scripts with the virtualenv absolute path
+SCRIPTS_DIRS = ("bin", "Scripts")
+
+
+def template_key(python, fingerprint, *options):
+    """A key identifying a template for an interpreter build and creation options"""
+    payload = json.dumps([python, fingerprint, virtualenv_version()] + list(options))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def virtualenv_version():
+    try:
+        import virtualenv
+    except ImportError:
+        return None
+    return getattr(virtualenv, "__version__", None)
+
+
+def ensure_template(root, key, python, args=()):
+    """
+    Get the template virtualenv for ``key``, creating it if missing.
+
+    The template is built in a temporary directory and moved atomically
+    so concurrent runs never see a partial template.
+    """
+    template = os.path.join(root, key)
+    if os.path.exists(os.path.join(template, MARKER)):
+        return template
+    os.makedirs(root, exist_ok=True)
+    build = tempfile.mkdtemp(prefix=".build-", dir=root)
+    try:
+        cmd = [sys.executable, "-m", "virtualenv", "--python", python] + list(args) + [build]
+        subprocess.check_output(cmd, stderr=subprocess.STDOUT, universal_newlines=True)
+        with open(os.path.join(build, MARKER), "w") as f:
+            json.dump({"prefix": build, "python": python}, f)
+        try:
+            os.rename(build, template)
+        except OSError:
+            # Another process won the race
+            if not os.path.exists(os.path.join(template, MARKER)):
+                raise
+    finally:
+        shutil.rmtree(build, ignore_errors=True)
+    return template
+
+
+def clone_template(template, target):
+    """
+    Clone a template virtualenv into ``target``.
+
+    Files are hardlinked when possible (copied otherwise),
+    except scripts referencing the template path which are rewritten.
+    """
+    with open(os.path.join(template, MARKER)) as f:
+        prefix = json.load(f)["prefix"]
+    for root, dirs, files in os.walk(template):
+        relative = os.path.relpath(root, template)
+        destination = os.path.normpath(os.path.join(target, relative))
+        os.makedirs(destination, exist_ok=True)
+        for name in list(dirs):
+            source = os.path.join(root, name)
+            if os.path.islink(source):
+                dirs.remove(name)
+                _clone_link(source, os.path.join(destination, name), prefix, target)
+        for name in files:
+            source = os.path.join(root, name)
+            dest = os.path.join(destination, name)
+            if relative == "." and name == MARKER:
+                continue
+            if os.path.islink(source):
+                _clone_link(source, dest, prefix, target)
+            elif relative in SCRIPTS_DIRS or (relative == "." and name == "pyvenv.cfg"):
+                _relocate(source, dest, prefix, target)
+            else:
+                _link_or_copy(source, dest)
+
+
+def _clone_link(source, dest, prefix, target):
+    link = os.readlink(source)
+    if link.startswith(prefix):
+        link = link.replace(prefix, target, 1)
+    os.symlink(link, dest)
+
+
+def _relocate(source, dest, prefix, target):
+    with open(source, "rb") as f:
+        content = f.read()
+    old = prefix.encode("utf-8")
+    if old not in content:
+        _link_or_copy(source, dest)
+        return
+    with open(dest, "wb") as f:
+        f.write(content.replace(old, target.encode("utf-8")))
+    shutil.copymode(source, dest)
+
+
+def _link_or_copy(source, dest):
+    try:
+        os.link(source, dest)
+    except OSError:
+        shutil.copy2(source, dest)
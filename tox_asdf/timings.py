@@ -0,0 +1,88 @@
+"""Record how long asdf interactions take"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Timings(object):
+    """
+    A log of timed events.
+
+    Each event has an ``operation`` name, a ``duration`` in seconds
+    and any extra detail (subprocess ``argv`` and ``returncode``, version...).
+    """
+
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+
+    def record(self, operation, duration=0.0, **details):
+        event = dict(operation=operation, duration=duration, **details)
+        with self.lock:
+            self.events.append(event)
+        return event
+
+    @contextmanager
+    def measure(self, operation, **details):
+        """Time a block, the yielded dict can be used to add details"""
+        start = time.perf_counter()
+        try:
+            yield details
+        finally:
+            self.record(operation, time.perf_counter() - start, **details)
+
+    def summary(self):
+        """Aggregate events by operation"""
+        summary = {}
+        for event in self.events:
+            stats = summary.setdefault(event["operation"], {"count": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["total"] += event["duration"]
+            stats["max"] = max(stats["max"], event["duration"])
+        return summary
+
+    @property
+    def commands(self):
+        return [event for event in self.events if "argv" in event]
+
+    def format(self):
+        """Format the summary as a table"""
+        summary = self.summary()
+        if not summary:
+            return []
+        width = max(len(name) for name in summary)
+        lines = [
+            "{:<{w}}  {:>5}  {:>10}  {:>10}".format(
+                "operation", "count", "total ms", "max ms", w=width
+            )
+        ]
+        for name, stats in sorted(summary.items(), key=lambda item: -item[1]["total"]):
+            lines.append(
+                "{:<{w}}  {:>5}  {:>10.1f}  {:>10.1f}".format(
+                    name, stats["count"], stats["total"] * 1000, stats["max"] * 1000, w=width
+                )
+            )
+        commands = self.commands
+        if commands:
+            lines.append("{} subprocesses:".format(len(commands)))
+            for event in commands:
+                lines.append(
+                    "  [{}] {:.1f} ms: {}".format(
+                        event["returncode"], event["duration"] * 1000, event["argv"]
+                    )
+                )
+        return lines
+
+    def dump(self, path):
+        """Write events and summary as JSON"""
+        data = {
+            "pid": os.getpid(),
+            "timestamp": time.time(),
+            "summary": self.summary(),
+            "events": self.events,
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
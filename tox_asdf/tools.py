@@ -0,0 +1,55 @@
+"""asdf managed tools other than python: versions files and shim-free paths"""
+
+import os
+
+
+def tool_versions_files(directory, home=None):
+    """The `.tool-versions` files asdf reads from ``directory``, closest first"""
+    paths = []
+    directory = os.path.abspath(directory)
+    while True:
+        paths.append(os.path.join(directory, ".tool-versions"))
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    paths.append(os.path.join(home or os.path.expanduser("~"), ".tool-versions"))
+    return paths
+
+
+def parse_tool_versions(path):
+    """Parse a `.tool-versions` file into a ``{tool: [versions]}`` dict"""
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return {}
+    tools = {}
+    for line in lines:
+        parts = line.split("#", 1)[0].split()
+        if len(parts) > 1:
+            tools[parts[0]] = parts[1:]
+    return tools
+
+
+def read_tool_versions(directory, home=None):
+    """Get the versions of each tool asdf would use from ``directory``, the closest file winning"""
+    tools = {}
+    for path in reversed(tool_versions_files(directory, home)):
+        tools.update(parse_tool_versions(path))
+    return tools
+
+
+def parse_tools(value):
+    """Parse the ``tools`` setting: one ``tool [version]`` per line"""
+    tools = {}
+    for line in value.splitlines():
+        parts = line.split("#", 1)[0].split()
+        if parts:
+            tools[parts[0]] = parts[1] if len(parts) > 1 else None
+    return tools
+
+
+def version_env_var(tool):
+    """The environment variable overriding a tool version (``ASDF_NODEJS_VERSION``...)"""
+    return "ASDF_{}_VERSION".format(tool.upper().replace("-", "_"))